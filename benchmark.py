@@ -0,0 +1,150 @@
+#! /usr/bin/env python
+"""Micro-benchmarks for the SecKC MHN Dashboard API.
+
+Usage: python benchmark.py [name ...]   (runs everything when no name is given)
+"""
+import os
+import subprocess
+import sys
+import time
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def timed(func, repeat=1):
+    """Return the best wall-clock time of ``repeat`` runs, in milliseconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run_cold(snippet):
+    """Time a snippet in a fresh interpreter so module caches don't skew results."""
+    code = (
+        "import time; start = time.perf_counter()\n"
+        f"{snippet}\n"
+        "print((time.perf_counter() - start) * 1000)"
+    )
+    env = dict(os.environ, HPFEEDS_RELAY_ENABLED='false')
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+@benchmark
+def startup():
+    """Cold import and app construction time (relay disabled)."""
+    import_ms = run_cold("import seckc_mhn_api.api_base")
+    create_ms = run_cold("from seckc_mhn_api.api_base import create_app; create_app()")
+    print(f"startup: import api_base       {import_ms:8.1f} ms")
+    print(f"startup: import + create_app() {create_ms:8.1f} ms")
+
+
+def sample_event(i):
+    """A representative cowrie-style HPFeeds event."""
+    return {
+        'identifier': f'sensor-{i % 40:02d}',
+        'channel': 'cowrie.sessions',
+        'timestamp': 1642251600.123 + i,
+        'src_ip': f'203.0.113.{i % 250}',
+        'src_port': 40000 + i % 20000,
+        'dst_ip': '192.0.2.10',
+        'dst_port': 22,
+        'protocol': 'ssh',
+        'hostIP': '192.0.2.10',
+        'data': {'username': 'root', 'password': f'hunter{i}', 'session': f'{i:032x}'}
+    }
+
+
+def sample_location(i):
+    """A sensor entry as built by /sensors/locations."""
+    return {
+        'sensor_data': {'id': i, 'name': f'sensor-{i:03d}', 'ip': f'198.51.100.{i % 250}',
+                        'hostname': f'honeypot-{i:03d}', 'uuid': f'{i:032x}'},
+        'location': {
+            'city': {'geoname_id': 4393217, 'names': {'en': 'Kansas City', 'de': 'Kansas City', 'ru': 'Канзас-Сити'}},
+            'continent': {'code': 'NA', 'geoname_id': 6255149, 'names': {'en': 'North America'}},
+            'country': {'geoname_id': 6252001, 'iso_code': 'US', 'names': {'en': 'United States'}},
+            'location': {'accuracy_radius': 50, 'latitude': 39.0997, 'longitude': -94.5786, 'time_zone': 'America/Chicago'},
+            'postal': {'code': '64111'},
+            'subdivisions': [{'geoname_id': 4398678, 'iso_code': 'MO', 'names': {'en': 'Missouri'}}],
+            'latitude': 39.0997,
+            'longitude': -94.5786
+        }
+    }
+
+
+@benchmark
+def serialization():
+    """stdlib json versus the serializer module on typical payloads."""
+    import json
+    from seckc_mhn_api import serializer
+
+    events = [sample_event(i) for i in range(1000)]
+    raw_events = [json.dumps(event).encode('utf-8') for event in events]
+    locations = [sample_location(i) for i in range(500)]
+
+    cases = [
+        ('encode 1000 events', lambda: [json.dumps(e) for e in events], lambda: [serializer.dumps(e) for e in events]),
+        ('decode 1000 events', lambda: [json.loads(r) for r in raw_events], lambda: [serializer.loads(r) for r in raw_events]),
+        ('encode 500 locations', lambda: json.dumps(locations), lambda: serializer.dumps_bytes(locations)),
+    ]
+    print(f"serialization: backend = {serializer.BACKEND}")
+    for label, stdlib, fast in cases:
+        stdlib_ms = timed(stdlib, repeat=20)
+        fast_ms = timed(fast, repeat=20)
+        print(f"serialization: {label:22s} json {stdlib_ms:7.2f} ms  {serializer.BACKEND} {fast_ms:7.2f} ms  "
+              f"({stdlib_ms / fast_ms:4.1f}x)")
+
+
+@benchmark
+def wire():
+    """Per-event JSON versus columnar batches (JSON and msgpack) for the Socket.IO stream."""
+    import json
+    from seckc_mhn_api.feeds import wire as wire_format
+
+    events = [sample_event(i) for i in range(1000)]
+    batch_size = 50  # roughly 200 events/s at the default 0.25 s batch interval
+    batches = [wire_format.encode_batch(events[i:i + batch_size]) for i in range(0, len(events), batch_size)]
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    per_event = [dumps(e) for e in events]
+    compact = [dumps(b) for b in batches]
+    rows = [('json per event', sum(map(len, per_event)),
+             timed(lambda: [dumps(e) for e in events], repeat=10),
+             timed(lambda: [json.loads(p) for p in per_event], repeat=10)),
+            ('compact batches', sum(map(len, compact)),
+             timed(lambda: [dumps(wire_format.encode_batch(events[i:i + batch_size]))
+                            for i in range(0, len(events), batch_size)], repeat=10),
+             timed(lambda: [wire_format.decode_batch(json.loads(p)) for p in compact], repeat=10))]
+
+    if wire_format.msgpack is not None:
+        import msgpack
+        packed = [wire_format.pack(b) for b in batches]
+        rows.append(('msgpack batches', sum(map(len, packed)),
+                     timed(lambda: [wire_format.pack(wire_format.encode_batch(events[i:i + batch_size]))
+                                    for i in range(0, len(events), batch_size)], repeat=10),
+                     timed(lambda: [wire_format.decode_batch(msgpack.unpackb(p)) for p in packed], repeat=10)))
+    else:
+        print("wire: msgpack not installed, skipping msgpack batches")
+
+    baseline = rows[0][1]
+    for label, size, encode_ms, decode_ms in rows:
+        print(f"wire: {label:16s} {size / 1024:8.1f} KiB ({baseline / size:4.1f}x smaller)  "
+              f"encode {encode_ms:6.2f} ms  decode {decode_ms:6.2f} ms  per 1000 events")
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
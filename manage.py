@@ -2,19 +2,52 @@
 
 import os
 
-from flask.ext.script import Manager
+import click
+from flask.cli import FlaskGroup
 
-from seckc_mhn_api import create_app
+from seckc_mhn_api.api_base import create_app
+from seckc_mhn_api.mongo import get_db
+from seckc_mhn_api.stats import indexes
 
 
-app = create_app(os.getenv('SECKC_MHN_API_CONFIG', 'default'))
-manager = Manager(app)
+def make_app():
+    # Management commands never need the live HPFeeds relay
+    return create_app(os.getenv('SECKC_MHN_API_CONFIG', 'default'), start_relay=False)
 
 
-@manager.shell
-def make_shell_context():
-    return dict(app=app)
+@click.group(cls=FlaskGroup, create_app=make_app)
+def manager():
+    """SecKC MHN Dashboard API management commands."""
+
+
+@manager.command('ensure-indexes')
+def ensure_indexes():
+    """Create the MongoDB indexes the stats and replay queries rely on."""
+    for name in indexes.ensure_indexes(get_db()):
+        click.echo(f"index ok: {name}")
+
+
+@manager.command('check-indexes')
+@click.option('--explain', is_flag=True, help='Run explain() on each query shape and flag collection scans.')
+def check_indexes(explain):
+    """Validate the indexes; exits non-zero if any are missing or a query scans the collection."""
+    db = get_db()
+    problems = 0
+
+    for name in indexes.missing_indexes(db):
+        click.echo(f"missing index: {name}", err=True)
+        problems += 1
+
+    if explain:
+        for result in indexes.explain_queries(db):
+            click.echo(f"{result['shape']:14s} {' <- '.join(result['stages'])} ({result['execution_ms']} ms)")
+            if result['collscan']:
+                click.echo(f"WARNING: COLLSCAN for query shape {result['shape']}", err=True)
+                problems += 1
+
+    if problems:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
-    manager.run()
+    manager()
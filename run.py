@@ -1,6 +1,13 @@
 """Run SecKC MHN Dashboard API."""
+# Pick the concurrency mode before anything imports socket/requests/pymongo
+from seckc_mhn_api.config import ENV_FILE_PATH, get_async_mode, load_env_file, monkey_patch
+load_env_file(ENV_FILE_PATH)
+monkey_patch(get_async_mode())
+
 import os
-from seckc_mhn_api.api_base import APP, SOCKET_IO_APP
+from seckc_mhn_api.api_base import create_app, SOCKET_IO_APP
+
+APP = create_app(os.environ.get('SECKC_MHN_API_CONFIG', 'default'))
 
 if __name__ == "__main__":
     host = os.environ.get('HOST', '0.0.0.0')
@@ -1,33 +1,70 @@
-"""Base API. Import all modules Here. Attach middleware."""
+"""Base API. Import all modules Here. Attach middleware.
+
+Importing this module has no side effects: the Flask app, database
+connections, GeoIP reader and HPFeeds relay are all set up by
+``create_app()`` or lazily on first use.
+"""
 import os
 from flask import Flask
 from flask_socketio import SocketIO
 from flask_cors import CORS
-from seckc_mhn_api.config import SETTINGS
+from seckc_mhn_api.config import CONFIG, ENV_FILE_PATH, check_monkey_patched, env_flag, get_async_mode, load_env_file
+from seckc_mhn_api.serializer import JSONProvider, SocketIOJSON
+from seckc_mhn_api.compression import compress_response
+
+SOCKET_IO_APP = SocketIO(json=SocketIOJSON)
+
+def create_app(config_name='default', start_relay=None):
+    """Build the Flask application.
+
+    ``start_relay`` overrides the ``HPFEEDS_RELAY_ENABLED`` setting; pass
+    False to run the API without a relay (e.g. in a shell or under test).
+    ``ASYNC_MODE=eventlet`` additionally requires the entry point to call
+    ``config.monkey_patch()`` first (see run.py); RuntimeError otherwise.
+    """
+    load_env_file(ENV_FILE_PATH)
+
+    app = Flask(__name__)
+    app.json = JSONProvider(app)
+    app.config.from_object(CONFIG[config_name])
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-me')
+    app.config['HPFEEDS_RELAY_ENABLED'] = env_flag('HPFEEDS_RELAY_ENABLED', app.config['HPFEEDS_RELAY_ENABLED'])
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', app.config['COMPRESSION_MIN_SIZE']))
+    app.config['ASYNC_MODE'] = get_async_mode()
+    check_monkey_patched(app.config['ASYNC_MODE'])
+
+    # Blueprints are imported here so their module-level settings see the env file,
+    # and before init_app so Socket.IO handlers are re-bound on every new app
+    from seckc_mhn_api.auth.controllers import AUTH_MODULE
+    from seckc_mhn_api.geocode.controllers import GEOCODE_MODULE
+    from seckc_mhn_api.stats.controllers import STATS_MODULE
+    from seckc_mhn_api.sensors.controllers import SENSORS_MODULE
+    from seckc_mhn_api.feeds.controllers import FEEDS_MODULE
+    from seckc_mhn_api.health.controllers import HEALTH_MODULE
+    from seckc_mhn_api.feeds import hpfeed_relay
 
-APP = Flask(__name__)
-APP.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-me')
+    CORS(app, origins="*", allow_headers=["Content-Type", "Authorization", "Cookie"])
+    # Always pass async_mode: Flask-SocketIO would otherwise pick eventlet just because it is installed
+    SOCKET_IO_APP.init_app(app, async_mode=app.config['ASYNC_MODE'],
+                           cors_allowed_origins="*", logger=True, engineio_logger=True)
 
-CORS(APP, origins="*", allow_headers=["Content-Type", "Authorization", "Cookie"])
-SOCKET_IO_APP = SocketIO(APP, cors_allowed_origins="*", logger=True, engineio_logger=True)
+    app.register_blueprint(AUTH_MODULE)
+    app.register_blueprint(GEOCODE_MODULE)
+    app.register_blueprint(STATS_MODULE)
+    app.register_blueprint(SENSORS_MODULE)
+    app.register_blueprint(FEEDS_MODULE)
+    app.register_blueprint(HEALTH_MODULE)
 
-from seckc_mhn_api.auth.controllers import AUTH_MODULE
-from seckc_mhn_api.geocode.controllers import GEOCODE_MODULE  
-from seckc_mhn_api.stats.controllers import STATS_MODULE
-from seckc_mhn_api.sensors.controllers import SENSORS_MODULE
+    app.after_request(manage_security_headers)
+    app.after_request(compress_response)
 
-import seckc_mhn_api.feeds.hpfeed_relay
-seckc_mhn_api.feeds.hpfeed_relay.start()
-import seckc_mhn_api.feeds.controllers
-from seckc_mhn_api.feeds.controllers import FEEDS_MODULE
+    if start_relay is None:
+        start_relay = app.config['HPFEEDS_RELAY_ENABLED']
+    if start_relay:
+        hpfeed_relay.start()
 
-APP.register_blueprint(AUTH_MODULE)
-APP.register_blueprint(GEOCODE_MODULE)
-APP.register_blueprint(STATS_MODULE)  
-APP.register_blueprint(SENSORS_MODULE)
-APP.register_blueprint(FEEDS_MODULE)
+    return app
 
-@APP.after_request
 def manage_security_headers(response):
     response.headers["Server"] = ""
     response.headers["X-Content-Type-Options"] = "nosniff"
@@ -36,4 +73,4 @@ def manage_security_headers(response):
     return response
 
 if __name__ == "__main__":
-    SOCKET_IO_APP.run(APP, host='0.0.0.0', port=5000, debug=False)
+    SOCKET_IO_APP.run(create_app(), host='0.0.0.0', port=5000, debug=False)
@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 import requests
 import certifi
 from seckc_mhn_api.config import SETTINGS
+from seckc_mhn_api.ratelimit import upstream_slot
 
 AUTH_MODULE = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -13,6 +14,7 @@ AUTH_MODULE = Blueprint('auth', __name__, url_prefix='/auth')
 CHN_AUTH_URL = os.environ.get('CHN_AUTH_URL', 'http://localhost:8000/auth/me/')
 
 @AUTH_MODULE.route("/me", methods=['GET'])
+@upstream_slot
 def auth_me():
     """Check authentication status via CHN server."""
     request_headers = dict(request.headers.items())
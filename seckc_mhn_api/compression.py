@@ -0,0 +1,108 @@
+"""Response compression and conditional GET for buffered API responses.
+
+gzip is always available; brotli and zstd are used when the ``brotli`` and
+``zstandard`` packages are installed.
+"""
+import gzip
+import hashlib
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/html', 'text/plain'}
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=5)
+
+def _brotli(data):
+    return brotli.compress(data, quality=5)
+
+def _zstd(data):
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+# Server preference order; only encodings whose library is installed
+ENCODERS = [
+    (name, encoder) for name, encoder, available in (
+        ('zstd', _zstd, zstandard is not None),
+        ('br', _brotli, brotli is not None),
+        ('gzip', _gzip, True),
+    ) if available
+]
+
+def choose_encoding():
+    """Pick the preferred encoding the client accepts, or None."""
+    accepted = request.accept_encodings
+    for name, encoder in ENCODERS:
+        if accepted[name] > 0:
+            return name, encoder
+    return None, None
+
+def etag_matches(etag):
+    """True if If-None-Match names etag or one of its compressed variants."""
+    if_none_match = request.if_none_match
+    return (if_none_match.contains_weak(etag)
+            or any(if_none_match.contains_weak(f"{etag}-{name}") for name, _ in ENCODERS))
+
+def not_modified(etag, weak=False):
+    """Build a 304 for a view that can tell the client is current without building the body."""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak)
+    return response
+
+def no_store(response):
+    """Mark a live status response (e.g. one carrying server_time) as not cacheable.
+
+    compress_response skips the ETag for these, since it would change on
+    every request and never produce a 304.
+    """
+    response.cache_control.no_store = True
+    return response
+
+def compress_response(response):
+    """Add an ETag, answer If-None-Match with 304 and compress bodies of at least COMPRESSION_MIN_SIZE bytes.
+
+    Responses that already carry an ETag (e.g. cached stats payloads, or a
+    weak one a view derived from its data) keep it; others get a strong
+    ETag hashed from the body unless they are ``no-store``. Compressed
+    variants get the encoding appended to the ETag, and a client
+    revalidating either variant gets a 304.
+    """
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    etag, weak = response.get_etag()
+    if etag is None and not response.cache_control.no_store:
+        etag = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    name, encoder = None, None
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+        if len(data) >= current_app.config['COMPRESSION_MIN_SIZE']:
+            name, encoder = choose_encoding()
+
+    variant = None
+    if etag is not None:
+        variant = f"{etag}-{name}" if name else etag
+        if request.if_none_match.contains_weak(variant) or request.if_none_match.contains_weak(etag):
+            response.set_etag(variant, weak)
+            response.status_code = 304
+            response.set_data(b'')
+            return response
+
+    if encoder is not None:
+        response.set_data(encoder(data))
+        response.headers['Content-Encoding'] = name
+    if variant is not None:
+        response.set_etag(variant, weak)
+    return response
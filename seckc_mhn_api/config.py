@@ -5,6 +5,7 @@ from pathlib import Path
 
 HOME = os.environ.get("HOME", "/tmp")
 CONFIG_PATH = Path(HOME) / "data" / "seckc_mhn_api" / "shared" / "config" / "settings.yaml"
+ENV_FILE_PATH = Path(__file__).parent.parent / "seckc_mhn_api.env"
 
 try:
     with open(CONFIG_PATH, "r", encoding="utf-8") as f:
@@ -15,4 +16,93 @@ except FileNotFoundError:
         "hpfeeds": {"host": "localhost", "port": 10000, "channels": [], "user": "", "token": ""},
         "mnemosyne": {"username": "", "password": ""},
         "mhn": {"apikey": ""}
-    }
\ No newline at end of file
+    }
+
+
+def load_env_file(env_file_path):
+    """Load environment variables from file (uWSGI env-file isn't always honoured)."""
+    env_vars = {}
+    try:
+        with open(env_file_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    env_vars[key] = value
+                    os.environ[key] = value
+        return env_vars
+    except Exception as e:
+        print(f"Failed to load environment file {env_file_path}: {e}")
+        return {}
+
+
+def env_flag(name, default=False):
+    """Read a true/false environment variable."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+ASYNC_MODES = ('threading', 'eventlet')
+
+
+def get_async_mode():
+    """Return the configured concurrency mode: 'threading' (default) or 'eventlet'."""
+    mode = os.environ.get('ASYNC_MODE', 'threading').lower()
+    if mode not in ASYNC_MODES:
+        raise ValueError(f"Unsupported ASYNC_MODE {mode!r}, expected one of {ASYNC_MODES}")
+    return mode
+
+
+def monkey_patch(mode):
+    """Make sockets, threads and sleeps cooperative for the given mode.
+
+    Must run before anything else imports socket, threading, requests or
+    pymongo, so it belongs at the very top of the entry point.
+    """
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+
+
+def check_monkey_patched(mode):
+    """Raise RuntimeError if mode needs monkey_patch() and it has not run.
+
+    Without it, blocking socket calls under eventlet stall every client
+    served by the process.
+    """
+    if mode == 'eventlet':
+        from eventlet import patcher
+        if not patcher.is_monkey_patched('socket'):
+            raise RuntimeError("ASYNC_MODE=eventlet requires eventlet.monkey_patch() before the app is imported; "
+                               "serve run:APP or call seckc_mhn_api.config.monkey_patch() first")
+
+
+class Config(object):
+    DEBUG = False
+    TESTING = False
+    HPFEEDS_RELAY_ENABLED = True
+    # Smallest response body worth compressing, in bytes
+    COMPRESSION_MIN_SIZE = 1024
+
+
+class ProductionConfig(Config):
+    pass
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class TestingConfig(Config):
+    TESTING = True
+    HPFEEDS_RELAY_ENABLED = False
+
+
+CONFIG = {
+    'production': ProductionConfig,
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'default': ProductionConfig,
+}
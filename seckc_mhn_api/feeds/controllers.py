@@ -1,10 +1,18 @@
 """Socket.IO handlers for real-time feed data."""
-import json
+import hashlib
+import threading
 import time
 from collections import deque
 from seckc_mhn_api.api_base import SOCKET_IO_APP
 from seckc_mhn_api.auth.controllers import socket_user_status, user_status
-from flask import request, Blueprint, jsonify
+from seckc_mhn_api.serializer import dumps_bytes, loads
+from seckc_mhn_api.ratelimit import rate_limit, upstream_slot
+from seckc_mhn_api.compression import etag_matches, no_store, not_modified
+from seckc_mhn_api.mongo import get_db, ping
+from seckc_mhn_api.feeds import replay as event_replay
+from seckc_mhn_api.feeds import wire
+from seckc_mhn_api.feeds import hpfeed_relay
+from flask import request, Blueprint, Response, jsonify, stream_with_context
 from flask_socketio import join_room, emit
 
 # Create Blueprint for REST endpoints
@@ -14,6 +22,13 @@ FEEDS_MODULE = Blueprint('feeds', __name__, url_prefix='/feeds')
 recent_events_cache = deque(maxlen=100)
 EVENT_RETENTION_SECONDS = 300
 
+# Stop events for Socket.IO replays in progress, by session id; each holds a REPLAY_SLOTS slot
+active_replays = {}
+_replays_lock = threading.Lock()
+
+# Batches events for clients that negotiated a compact wire format
+EVENT_BATCHER = wire.Batcher(SOCKET_IO_APP)
+
 def sanitize_data(d):
     """Recursively sanitize data by removing sensitive fields."""
     if not isinstance(d, (dict, list)):
@@ -24,13 +39,28 @@ def sanitize_data(d):
             if k not in {'hostIP', 'local_host', 'victimIP', 'secret'}}
 
 def cache_event(event_data):
-    """Cache event data with timestamp for REST API access."""
+    """Cache event data with timestamp for REST API access.
+
+    The sanitized copy is built once here and reused for anonymous emits
+    and REST reads. Returns the cache entry.
+    """
     cached_event = {
         'data': event_data,
+        'sanitized': sanitize_data(event_data),
         'timestamp': time.time(),
         'cached_at': time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())
     }
     recent_events_cache.append(cached_event)
+    return cached_event
+
+def publish_event(event_data):
+    """Cache an event and send it to every room, in each client's wire format."""
+    cached_event = cache_event(event_data)
+    SOCKET_IO_APP.emit('hpfeedevent', event_data, to='activeUsers')
+    SOCKET_IO_APP.emit('hpfeedevent', cached_event['sanitized'], to='anonUsers')
+    EVENT_BATCHER.add('activeUsers', event_data)
+    EVENT_BATCHER.add('anonUsers', cached_event['sanitized'])
+    return cached_event
 
 def get_cached_events(authenticated=False, since=None):
     """Retrieve cached events, optionally filtered by timestamp."""
@@ -46,9 +76,7 @@ def get_cached_events(authenticated=False, since=None):
         if since and cached_event['timestamp'] <= since:
             continue
             
-        event_data = cached_event['data']
-        if not authenticated:
-            event_data = sanitize_data(event_data)
+        event_data = cached_event['data'] if authenticated else cached_event['sanitized']
             
         events.append({
             'event': event_data,
@@ -58,26 +86,30 @@ def get_cached_events(authenticated=False, since=None):
     
     return events
 
+def events_etag(events, authenticated):
+    """ETag for a window of cached events.
+
+    The cache is append-only, so the window is identified by its size and
+    the timestamps of its first and last events.
+    """
+    first = events[0]['timestamp'] if events else None
+    last = events[-1]['timestamp'] if events else None
+    version = f"{authenticated}:{len(events)}:{first!r}:{last!r}"
+    return hashlib.blake2b(version.encode('utf-8'), digest_size=16).hexdigest()
+
 @SOCKET_IO_APP.on('hpfeedevent')
 def handle_hpfeed_event(data):
     """Handle incoming HPFeed events and broadcast to appropriate rooms."""
     try:
-        if isinstance(data, str):
-            parsed_data = json.loads(data)
+        if isinstance(data, (str, bytes)):
+            parsed_data = loads(data)
         else:
             parsed_data = data
             
-        # Cache the event for REST API access
-        cache_event(parsed_data)
-        
-        # Send full data to authenticated users
-        emit('hpfeedevent', parsed_data, room='activeUsers')
-        
-        # Send sanitized data to anonymous users
-        sanitized = sanitize_data(parsed_data)
-        emit('hpfeedevent', sanitized, room='anonUsers')
+        # Cache for REST API access, send full data to authenticated users, sanitized to anonymous
+        publish_event(parsed_data)
         
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"JSON decode error in hpfeed event: {e}")
     except Exception as e:
         print(f"Error handling hpfeed event: {e}")
@@ -85,18 +117,29 @@ def handle_hpfeed_event(data):
 @SOCKET_IO_APP.on('connect')
 @socket_user_status
 def handle_user_connection():
-    """Handle user connections and assign to appropriate rooms."""
+    """Handle user connections and assign to appropriate rooms.
+
+    Clients may ask for a compact event stream with ``?format=compact`` or
+    ``?format=msgpack``; see feeds/wire.py.
+    """
     try:
         user_agent = request.headers.get("User-Agent", "").encode('utf-8')
+        wire_format = wire.negotiate(request.args.get('format', 'json'))
         
         if getattr(request, 'user_active', False):
             print("Authenticated user connected")
-            join_room("activeUsers")
+            room = "activeUsers"
+        elif not user_agent.startswith(b"python-requests"):
+            print("Anonymous user connected")
+            room = "anonUsers"
         else:
             # Don't add bots/automated clients to anonymous room
-            if not user_agent.startswith(b"python-requests"):
-                print("Anonymous user connected")
-                join_room("anonUsers")
+            return
+            
+        join_room(wire.room_for(room, wire_format))
+        if wire_format != 'json':
+            EVENT_BATCHER.add_client(request.sid, wire_format)
+            emit('hpfeedformat', {'format': wire_format, 'version': wire.WIRE_FORMAT_VERSION})
                 
     except Exception as e:
         print(f"Error handling user connection: {e}")
@@ -104,12 +147,75 @@ def handle_user_connection():
 @SOCKET_IO_APP.on('disconnect')
 def handle_disconnect():
     """Handle user disconnections."""
+    stop_replay(request.sid)
+    EVENT_BATCHER.remove_client(request.sid)
     print("User disconnected")
 
+def stop_replay(sid):
+    """Stop the replay running for a Socket.IO session, if any."""
+    with _replays_lock:
+        stop = active_replays.get(sid)
+    if stop is not None:
+        stop.set()
+
+def run_socket_replay(sid, params, authenticated, stop):
+    """Background task emitting a replay to one Socket.IO session."""
+    try:
+        count = 0
+        for event in event_replay.replay(*params, authenticated=authenticated, stop=stop,
+                                         sleep=SOCKET_IO_APP.sleep):
+            SOCKET_IO_APP.emit('replayevent', event, to=sid)
+            count += 1
+        SOCKET_IO_APP.emit('replayend', {'count': count, 'stopped': stop.is_set()}, to=sid)
+    except Exception as e:
+        print(f"Error replaying events: {e}")
+        SOCKET_IO_APP.emit('replayend', {'error': 'Replay failed'}, to=sid)
+    finally:
+        with _replays_lock:
+            # A replacement replay for the same client has taken over the slot
+            if active_replays.get(sid) is stop:
+                del active_replays[sid]
+                event_replay.REPLAY_SLOTS.release()
+
+@SOCKET_IO_APP.on('replay')
+@socket_user_status
+def handle_replay(data):
+    """Start replaying historical events to this client as 'replayevent' messages."""
+    if not isinstance(data, dict):
+        emit('replayend', {'error': 'replay expects an object with start, end and speed'})
+        return
+    try:
+        params = event_replay.parse_replay_args(data)
+    except ValueError as e:
+        emit('replayend', {'error': str(e)})
+        return
+
+    # One replay per client; a new request replaces the old one and inherits its slot
+    stop = threading.Event()
+    with _replays_lock:
+        previous = active_replays.get(request.sid)
+        started = previous is not None or event_replay.REPLAY_SLOTS.acquire(blocking=False)
+        if started:
+            active_replays[request.sid] = stop
+    if not started:
+        emit('replayend', {'error': 'Too many replays in progress, try again shortly'})
+        return
+    if previous is not None:
+        previous.set()
+    SOCKET_IO_APP.start_background_task(run_socket_replay, request.sid, params,
+                                        getattr(request, 'user_active', False), stop)
+
+@SOCKET_IO_APP.on('replay_stop')
+def handle_replay_stop():
+    """Stop this client's replay."""
+    stop_replay(request.sid)
+
 # REST API Endpoints
 
 @FEEDS_MODULE.route("/events/recent", methods=['GET'])
+@upstream_slot
 @user_status
+@rate_limit('events')
 def get_recent_events():
     """Get recent HPFeed events via REST API."""
     try:
@@ -128,18 +234,61 @@ def get_recent_events():
         
         # Apply limit
         events = events[-limit:] if limit else events
-        
-        return jsonify({
+
+        # server_time changes on every request, so the ETag tracks the events returned instead of the body
+        etag = events_etag(events, authenticated)
+        if etag_matches(etag):
+            return not_modified(etag, weak=True)
+
+        response = jsonify({
             'events': events,
             'count': len(events),
             'authenticated': authenticated,
             'server_time': time.time()
         })
+        response.set_etag(etag, weak=True)
+        return response
         
     except Exception as e:
         print(f"Error retrieving recent events: {e}")
         return jsonify({'error': 'Failed to retrieve recent events'}), 500
 
+@FEEDS_MODULE.route("/replay", methods=['GET'])
+@upstream_slot
+@user_status
+@rate_limit('replay')
+def get_replay():
+    """Stream historical events as NDJSON, paced by the speed parameter."""
+    try:
+        start, end, speed, collection = event_replay.parse_replay_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # The client connects lazily, so only a ping shows MongoDB is reachable
+    if get_db() is None or not ping():
+        return jsonify({'error': 'Database connection unavailable'}), 503
+    if not event_replay.REPLAY_SLOTS.acquire(blocking=False):
+        response = jsonify({'error': 'Too many replays in progress, try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+
+    authenticated = getattr(request, 'user_active', False)
+
+    def generate():
+        try:
+            for event in event_replay.replay(start, end, speed, collection, authenticated):
+                yield dumps_bytes(event) + b"\n"
+        except Exception as e:
+            print(f"Error replaying events: {e}")
+            # Headers are already sent; a final error line tells the client the replay is incomplete
+            yield dumps_bytes({'error': 'Replay failed'}) + b"\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Runs even if the client goes away before the first event is sent
+    response.call_on_close(event_replay.REPLAY_SLOTS.release)
+    return response
+
 @FEEDS_MODULE.route("/status", methods=['GET'])
 def get_feed_status():
     """Get status of HPFeeds relay and recent events cache."""
@@ -148,13 +297,15 @@ def get_feed_status():
         valid_events = sum(1 for event in recent_events_cache 
                           if current_time - event['timestamp'] <= EVENT_RETENTION_SECONDS)
         
-        return jsonify({
-            'status': 'active',
+        relay = hpfeed_relay.status()
+        return no_store(jsonify({
+            'status': relay['state'],
+            'relay': relay,
             'cached_events': len(recent_events_cache),
             'valid_events': valid_events,
             'retention_seconds': EVENT_RETENTION_SECONDS,
             'server_time': current_time
-        })
+        }))
         
     except Exception as e:
         print(f"Error getting feed status: {e}")
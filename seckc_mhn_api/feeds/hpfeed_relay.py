@@ -7,6 +7,8 @@ import json
 import threading
 import time
 from seckc_mhn_api.config import SETTINGS
+from seckc_mhn_api.serializer import loads
+from seckc_mhn_api.feeds.throughput import CHANNEL_THROUGHPUT, SENSOR_THROUGHPUT
 
 # Try to import socketio (modern python-socketio), disable HPFeeds relay if not available
 try:
@@ -24,50 +26,67 @@ logger = logging.getLogger(__name__)
 # Environment variables are loaded by uWSGI (env-file) or Docker Compose (env_file)
 # No manual file reading required
 
-# HPFeeds configuration with proper fallbacks (environment variables take precedence over SETTINGS values)
-HPFEEDS_CONFIG = SETTINGS.get("hpfeeds", {})
-HOST = os.environ.get("HPFEEDS_HOST") or HPFEEDS_CONFIG.get("host", "localhost")
-PORT = int(os.environ.get("HPFEEDS_PORT") or HPFEEDS_CONFIG.get("port") or "10000")
-CHANNELS_STR = os.environ.get("HPFEEDS_CHANNELS") or HPFEEDS_CONFIG.get("channels", "")
-CHANNELS = CHANNELS_STR.split(",") if CHANNELS_STR else []
-IDENT = os.environ.get("HPFEEDS_USER") or HPFEEDS_CONFIG.get("user", "")
-SECRET = os.environ.get("HPFEEDS_SECRET") or HPFEEDS_CONFIG.get("token", "")
+# Relay thread and state, reported by /health/ready and /feeds/status
+_relay_thread = None
+_relay_lock = threading.Lock()
+RELAY_STATE = {
+    'started': False,
+    'running': False,
+    'error': None
+}
 
-# Socket.IO connection settings
-SOCKETIO_HOST = os.environ.get("SOCKETIO_HOST", "127.0.0.1")
-SOCKETIO_PORT = int(os.environ.get("SOCKETIO_PORT", "5000"))
+def load_config():
+    """Read HPFeeds configuration (environment variables take precedence over SETTINGS values)."""
+    hpfeeds_config = SETTINGS.get("hpfeeds", {})
+    channels = os.environ.get("HPFEEDS_CHANNELS") or hpfeeds_config.get("channels", "")
+    if isinstance(channels, str):
+        channels = channels.split(",") if channels else []
+    return {
+        'host': os.environ.get("HPFEEDS_HOST") or hpfeeds_config.get("host", "localhost"),
+        'port': int(os.environ.get("HPFEEDS_PORT") or hpfeeds_config.get("port") or "10000"),
+        'channels': channels,
+        'ident': os.environ.get("HPFEEDS_USER") or hpfeeds_config.get("user", ""),
+        'secret': os.environ.get("HPFEEDS_SECRET") or hpfeeds_config.get("token", "")
+    }
 
 def main():
     """Main HPFeeds relay function."""
+    config = load_config()
     try:
         import hpfeeds
-        hpc = hpfeeds.new(HOST, PORT, IDENT, SECRET)
+        hpc = hpfeeds.new(config['host'], config['port'], config['ident'], config['secret'])
 
-        # Import cache_event and emit functions to directly communicate with controllers
-        from seckc_mhn_api.feeds.controllers import cache_event, sanitize_data
-        from seckc_mhn_api.api_base import SOCKET_IO_APP
+        # Import publish_event to directly communicate with controllers
+        from seckc_mhn_api.feeds.controllers import publish_event
         
         def on_message(identifier, channel, payload):
             """Handle incoming HPFeeds messages."""
             try:
-                # Parse payload
-                if isinstance(payload, bytes):
-                    payload = payload.decode('utf-8', errors='ignore')
-                
-                message_data = json.loads(str(payload))
+                # Parse payload straight from bytes; only decode leniently if that fails
+                try:
+                    message_data = loads(payload)
+                except ValueError:
+                    if not isinstance(payload, bytes):
+                        raise
+                    message_data = loads(payload.decode('utf-8', errors='ignore'))
                 message_data['identifier'] = identifier
                 message_data['channel'] = channel
                 message_data['timestamp'] = time.time()
                 
+                SENSOR_THROUGHPUT.record(identifier, channel, now=message_data['timestamp'])
+                CHANNEL_THROUGHPUT.record(channel, now=message_data['timestamp'])
+                
                 # Cache the event directly and emit via Socket.IO app
-                cache_event(message_data)
-                SOCKET_IO_APP.emit('hpfeedevent', message_data, room='activeUsers')
-                SOCKET_IO_APP.emit('hpfeedevent', sanitize_data(message_data), room='anonUsers')
+                publish_event(message_data)
                 
             except json.JSONDecodeError as e:
                 logger.error(f'JSON decode error for message from {identifier}: {e}')
+                SENSOR_THROUGHPUT.record_error(identifier)
+                CHANNEL_THROUGHPUT.record_error(channel)
             except Exception as e:
                 logger.error(f'Error forwarding message from {identifier}: {e}')
+                SENSOR_THROUGHPUT.record_error(identifier)
+                CHANNEL_THROUGHPUT.record_error(channel)
                 traceback.print_exc()
 
         def on_error(payload):
@@ -76,8 +95,9 @@ def main():
             hpc.stop()
 
         # Subscribe to channels and start processing
-        if CHANNELS and CHANNELS[0]:  # Check if channels are configured
-            hpc.subscribe(CHANNELS)
+        if config['channels'] and config['channels'][0]:  # Check if channels are configured
+            hpc.subscribe(config['channels'])
+            RELAY_STATE['running'] = True
             hpc.run(on_message, on_error)
         else:
             logger.warning("No HPFeeds channels configured")
@@ -87,23 +107,64 @@ def main():
         
     except Exception as e:
         logger.error(f"HPFeeds relay error: {e}")
+        RELAY_STATE['error'] = str(e)
         traceback.print_exc()
         return 1
+    finally:
+        RELAY_STATE['running'] = False
 
 def start():
-    """Start HPFeeds relay in daemon thread."""
+    """Start HPFeeds relay as a background task. Safe to call more than once.
+
+    Must be called after the Socket.IO server has been initialised so the
+    task matches the configured async mode.
+    """
+    global _relay_thread
     if not SOCKETIO_AVAILABLE:
         logger.warning("python-socketio not available, HPFeeds relay not started")
-        return
-        
-    if not all([HOST, PORT, IDENT, SECRET]):
+        return None
+
+    config = load_config()
+    if not all([config['host'], config['port'], config['ident'], config['secret']]):
         logger.warning("HPFeeds configuration incomplete, relay not started")
-        return
-        
-    relay_thread = threading.Thread(target=main, name="HPFeedsRelay")
-    relay_thread.daemon = True
-    relay_thread.start()
+        return None
+
+    from seckc_mhn_api.api_base import SOCKET_IO_APP
+
+    with _relay_lock:
+        if _relay_thread is not None and _is_alive(_relay_thread):
+            return _relay_thread
+        RELAY_STATE['error'] = None
+        # A daemon thread in threading mode, a green thread in eventlet mode
+        _relay_thread = SOCKET_IO_APP.start_background_task(main)
+        RELAY_STATE['started'] = True
     logger.info("HPFeeds relay started")
+    return _relay_thread
+
+def _is_alive(task):
+    """Liveness for both threading.Thread and eventlet GreenThread."""
+    # Engine.IO wraps the green thread in an EventletThread holding it as ``g``
+    task = getattr(task, 'g', task)
+    if hasattr(task, 'is_alive'):
+        return task.is_alive()
+    return not getattr(task, 'dead', True)
+
+def status():
+    """Return a snapshot of the relay state, with ``state`` summarising it.
+
+    ``state`` is 'disabled' (never started in this worker), 'starting'
+    (connecting), 'active' (subscribed), 'error' or 'stopped'.
+    """
+    snapshot = dict(RELAY_STATE)
+    if not snapshot['started']:
+        snapshot['state'] = 'disabled'
+    elif snapshot['running']:
+        snapshot['state'] = 'active'
+    elif _relay_thread is not None and _is_alive(_relay_thread):
+        snapshot['state'] = 'starting'
+    else:
+        snapshot['state'] = 'error' if snapshot['error'] else 'stopped'
+    return snapshot
 
 if __name__ == '__main__':
     try:
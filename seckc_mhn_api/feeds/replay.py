@@ -0,0 +1,200 @@
+"""Replay historical honeypot events from the Mnemosyne collections.
+
+Documents are read through a server-side cursor by a producer thread into
+a bounded queue. The consumer paces them by their original spacing divided
+by the replay speed, so a replay of any length runs in constant memory.
+"""
+import datetime
+import math
+import os
+import queue
+import threading
+import time
+from bson import ObjectId
+from seckc_mhn_api.config import get_async_mode
+from seckc_mhn_api.mongo import get_db
+
+REPLAY_COLLECTIONS = set(os.environ.get('REPLAY_COLLECTIONS', 'session').split(','))
+REPLAY_MAX_RANGE_SECONDS = int(os.environ.get('REPLAY_MAX_RANGE_SECONDS', 86400))
+REPLAY_MAX_SPEED = float(os.environ.get('REPLAY_MAX_SPEED', 1000))
+# Longest pause between two replayed events, after speed-up
+REPLAY_MAX_GAP_SECONDS = float(os.environ.get('REPLAY_MAX_GAP_SECONDS', 5))
+REPLAY_PREFETCH = int(os.environ.get('REPLAY_PREFETCH', 500))
+REPLAY_BATCH_SIZE = int(os.environ.get('REPLAY_BATCH_SIZE', 200))
+# The server expires sessions idle for 30 minutes; refresh well before that
+REPLAY_SESSION_REFRESH_SECONDS = 300
+
+# Replays hold a worker (or green thread) and a cursor for their whole duration.
+# Under threading, uWSGI only has a couple of worker threads per process
+# (uwsgi.ini), so by default a single replay may run at a time.
+REPLAY_SLOTS = threading.BoundedSemaphore(int(os.environ.get(
+    'REPLAY_MAX_CONCURRENT', 1 if get_async_mode() == 'threading' else 4)))
+
+# Mnemosyne's normalized names for the fields the live feed strips for
+# anonymous clients (hostIP, local_host, victimIP: the honeypot's address)
+REPLAY_SENSITIVE_KEYS = frozenset(['destination_ip'])
+
+_END = object()
+
+def parse_replay_args(args):
+    """Validate replay parameters from a request's args (or a Socket.IO payload).
+
+    ``start`` and ``end`` are epoch seconds, ``speed`` a multiplier (0 means
+    no pacing). Raises ValueError with a client-facing message.
+    """
+    try:
+        start = float(args.get('start'))
+        end = float(args.get('end'))
+        speed = float(args.get('speed', 10))
+    except (TypeError, ValueError):
+        raise ValueError('start and end (epoch seconds) are required; speed must be a number')
+    if not all(math.isfinite(value) for value in (start, end, speed)):
+        raise ValueError('start, end and speed must be finite numbers')
+    collection = args.get('collection', 'session')
+    if not isinstance(collection, str):
+        raise ValueError('collection must be a string')
+
+    if end <= start:
+        raise ValueError('end must be after start')
+    if end - start > REPLAY_MAX_RANGE_SECONDS:
+        raise ValueError(f'Replay range is limited to {REPLAY_MAX_RANGE_SECONDS} seconds')
+    if not 0 <= speed <= REPLAY_MAX_SPEED:
+        raise ValueError(f'speed must be between 0 and {REPLAY_MAX_SPEED}')
+    if collection not in REPLAY_COLLECTIONS:
+        raise ValueError(f'collection must be one of: {", ".join(sorted(REPLAY_COLLECTIONS))}')
+    return start, end, speed, collection
+
+def _utc(epoch):
+    # Mnemosyne stores naive UTC datetimes
+    return datetime.datetime.fromtimestamp(epoch, datetime.timezone.utc).replace(tzinfo=None)
+
+def _epoch(value):
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+def _jsonable(value):
+    """Turn stored BSON types into JSON ones so replayed events serialize like live ones.
+
+    Datetimes become ISO strings, ObjectIds (e.g. ``hpfeed_id``) their hex
+    string and binary payloads hex.
+    """
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+def _strip_sensitive(value):
+    if isinstance(value, dict):
+        return {k: _strip_sensitive(v) for k, v in value.items() if k not in REPLAY_SENSITIVE_KEYS}
+    if isinstance(value, list):
+        return [_strip_sensitive(v) for v in value]
+    return value
+
+def to_event(document, authenticated):
+    """Shape a stored document like a live hpfeedevent.
+
+    Anonymous clients get the live feed's sanitization, applied to both the
+    HPFeeds field names and their normalized Mnemosyne equivalents.
+    """
+    # Imported here; feeds.controllers imports this module
+    from seckc_mhn_api.feeds.controllers import sanitize_data
+
+    event = _jsonable({k: v for k, v in document.items() if k != 'timestamp'})
+    event['timestamp'] = _epoch(document['timestamp'])
+    event['replay'] = True
+    return event if authenticated else _strip_sensitive(sanitize_data(event))
+
+def _put(buffer, item, stop, idle=None):
+    """Put into the bounded buffer, giving up once the replay is stopped.
+
+    ``idle`` is called every half second while the buffer stays full.
+    """
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            if idle is not None:
+                idle()
+    return False
+
+def _produce(collection, query, buffer, stop):
+    # A slow replay can leave the cursor idle far longer than the server's
+    # 10 minute cursor timeout, so the cursor never times out and lives in an
+    # explicit session that is refreshed while the consumer catches up.
+    try:
+        with collection.database.client.start_session() as session:
+            last_used = time.monotonic()
+
+            def keep_alive():
+                nonlocal last_used
+                if time.monotonic() - last_used >= REPLAY_SESSION_REFRESH_SECONDS:
+                    collection.database.client.admin.command(
+                        'refreshSessions', [session.session_id], session=session)
+                    last_used = time.monotonic()
+
+            cursor = collection.find(query, {'_id': 0}, batch_size=REPLAY_BATCH_SIZE,
+                                     no_cursor_timeout=True, session=session).sort('timestamp', 1)
+            try:
+                for document in cursor:
+                    last_used = time.monotonic()
+                    if not _put(buffer, document, stop, keep_alive):
+                        break
+            finally:
+                cursor.close()
+    except Exception as e:
+        _put(buffer, e, stop)
+    finally:
+        _put(buffer, _END, stop)
+
+def replay(start, end, speed, collection, authenticated, stop=None, sleep=time.sleep):
+    """Yield events recorded between start and end, paced for the given speed.
+
+    ``stop`` (a threading.Event) ends the replay early and is only ever set
+    by the caller; ``sleep`` lets a Socket.IO background task use the
+    server's cooperative sleep.
+    """
+    db = get_db()
+    if db is None:
+        raise RuntimeError('Database connection unavailable')
+
+    stop = stop or threading.Event()
+    # Set when this generator finishes, for whatever reason, to end the producer
+    done = threading.Event()
+    query = {'timestamp': {'$gte': _utc(start), '$lt': _utc(end)}}
+
+    buffer = queue.Queue(maxsize=REPLAY_PREFETCH)
+    producer = threading.Thread(target=_produce, args=(db[collection], query, buffer, done), name="ReplayPrefetch")
+    producer.daemon = True
+    producer.start()
+
+    previous = None
+    try:
+        while not stop.is_set():
+            try:
+                item = buffer.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            timestamp = item.get('timestamp')
+            if not isinstance(timestamp, datetime.datetime):
+                continue
+            if previous is not None and speed > 0:
+                gap = min((timestamp - previous).total_seconds() / speed, REPLAY_MAX_GAP_SECONDS)
+                if gap > 0:
+                    sleep(gap)
+            previous = timestamp
+
+            yield to_event(item, authenticated)
+    finally:
+        done.set()
@@ -0,0 +1,92 @@
+"""Per-sensor and per-channel throughput tracking for the HPFeeds relay.
+
+Each table holds at most ``max_keys`` entries (least recently seen are
+evicted) with last-seen time, an exponentially weighted events/sec rate
+and event/error counters, so sensor health is an in-memory read.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Time constant of the EWMA rate, in seconds
+THROUGHPUT_WINDOW_SECONDS = float(os.environ.get('THROUGHPUT_WINDOW_SECONDS', 60))
+THROUGHPUT_TABLE_SIZE = int(os.environ.get('THROUGHPUT_TABLE_SIZE', 4096))
+
+
+class Counter(object):
+    __slots__ = ('last_seen', 'rate', 'events', 'errors', 'last_channel')
+
+    def __init__(self):
+        self.last_seen = None
+        self.rate = 0.0
+        self.events = 0
+        self.errors = 0
+        self.last_channel = None
+
+
+class ThroughputTable(object):
+    """Fixed-size, thread-safe table of Counters keyed by sensor identifier or channel."""
+
+    def __init__(self, max_keys=THROUGHPUT_TABLE_SIZE, window=THROUGHPUT_WINDOW_SECONDS):
+        self.max_keys = max_keys
+        self.window = window
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _counter(self, key):
+        counter = self._counters.pop(key, None) or Counter()
+        self._counters[key] = counter
+        if len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+        return counter
+
+    def _decayed(self, counter, now):
+        if counter.last_seen is None:
+            return 0.0
+        return counter.rate * math.exp(-(now - counter.last_seen) / self.window)
+
+    def record(self, key, channel=None, now=None):
+        """Count one event for key."""
+        now = time.time() if now is None else now
+        with self._lock:
+            counter = self._counter(key)
+            counter.rate = self._decayed(counter, now) + 1 / self.window
+            counter.last_seen = now
+            counter.events += 1
+            if channel is not None:
+                counter.last_channel = channel
+
+    def record_error(self, key, now=None):
+        """Count one undeliverable message (e.g. bad JSON) for key."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._counter(key).errors += 1
+
+    def snapshot(self, now=None):
+        """Return {key: stats dict} for every tracked key."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {key: self._stats(counter, now) for key, counter in self._counters.items()}
+
+    def get(self, key, now=None):
+        """Return the stats dict for key, or None if it has never been seen."""
+        now = time.time() if now is None else now
+        with self._lock:
+            counter = self._counters.get(key)
+            return self._stats(counter, now) if counter is not None else None
+
+    def _stats(self, counter, now):
+        return {
+            'last_seen': counter.last_seen,
+            'seconds_since_seen': now - counter.last_seen if counter.last_seen is not None else None,
+            'events_per_sec': round(self._decayed(counter, now), 4),
+            'events': counter.events,
+            'errors': counter.errors,
+            'last_channel': counter.last_channel
+        }
+
+
+SENSOR_THROUGHPUT = ThroughputTable()
+CHANNEL_THROUGHPUT = ThroughputTable()
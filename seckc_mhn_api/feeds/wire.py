@@ -0,0 +1,151 @@
+"""Compact wire formats for the Socket.IO event stream.
+
+Clients pick a format on connect (``?format=compact`` or ``?format=msgpack``)
+and then receive ``hpfeedbatch`` messages instead of one ``hpfeedevent``
+per event. A batch is columnar and self-contained::
+
+    {"v": 1, "n": 3,
+     "keys": ["identifier", "channel", "timestamp", ...],
+     "strings": ["sensor-01", "cowrie.sessions", ...],
+     "dict": [0, 1],
+     "present": [null, null, null, [0, 2], ...],
+     "columns": [[0, 0, 2], [1, 1, 1], [1642251600.1, ...], ...]}
+
+Each key name is sent once per batch. Columns listed in ``dict`` (by key
+position) hold indexes into ``strings`` instead of the strings
+themselves. ``present`` is null for keys every event has, and otherwise
+lists the rows (events) that have the key; the other rows hold a null
+placeholder and decode without the key, so mixed-channel batches
+round-trip exactly.
+``msgpack`` sends the same batch packed as a binary frame; it needs the
+``msgpack`` package and falls back to ``compact`` without it.
+"""
+import os
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+WIRE_FORMAT_VERSION = 1
+FORMATS = ('json', 'compact', 'msgpack')
+# Seconds between batches, and the most events one batch will carry
+WIRE_BATCH_INTERVAL = float(os.environ.get('WIRE_BATCH_INTERVAL', 0.25))
+WIRE_BATCH_MAX = int(os.environ.get('WIRE_BATCH_MAX', 500))
+# Low-cardinality string fields worth dictionary-encoding
+DICTIONARY_KEYS = frozenset(['identifier', 'channel', 'protocol', 'transport', 'honeypot', 'type',
+                             'dst_ip', 'dest_ip', 'destination_ip'])
+
+def negotiate(requested):
+    """Return the format to use for a client's requested one."""
+    if requested == 'msgpack' and msgpack is None:
+        return 'compact'
+    return requested if requested in FORMATS else 'json'
+
+def room_for(base_room, wire_format):
+    """Room name for a base room ('activeUsers'/'anonUsers') and a format."""
+    return base_room if wire_format == 'json' else f"{base_room}:{wire_format}"
+
+def encode_batch(events):
+    """Encode a list of event dicts into a columnar batch."""
+    keys = []
+    key_index = {}
+    for event in events:
+        for key in event:
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+
+    strings = []
+    string_index = {}
+    dictionary_columns = []
+    present = []
+    columns = []
+    for position, key in enumerate(keys):
+        rows = [row for row, event in enumerate(events) if key in event]
+        present.append(rows if len(rows) < len(events) else None)
+        column = [event.get(key) for event in events]
+        if key in DICTIONARY_KEYS and all(value is None or isinstance(value, str) for value in column):
+            dictionary_columns.append(position)
+            for i, value in enumerate(column):
+                if value is not None:
+                    if value not in string_index:
+                        string_index[value] = len(strings)
+                        strings.append(value)
+                    column[i] = string_index[value]
+        columns.append(column)
+
+    return {'v': WIRE_FORMAT_VERSION, 'n': len(events), 'keys': keys, 'strings': strings,
+            'dict': dictionary_columns, 'present': present, 'columns': columns}
+
+def decode_batch(batch):
+    """Reverse encode_batch (reference for clients)."""
+    strings = batch['strings']
+    dictionary_columns = set(batch['dict'])
+    events = [{} for _ in range(batch['n'])]
+    for position, (key, rows, column) in enumerate(zip(batch['keys'], batch['present'], batch['columns'])):
+        dictionary = position in dictionary_columns
+        for row in (range(batch['n']) if rows is None else rows):
+            value = column[row]
+            if dictionary and value is not None:
+                value = strings[value]
+            events[row][key] = value
+    return events
+
+def pack(batch):
+    return msgpack.packb(batch, use_bin_type=True)
+
+
+class Batcher(object):
+    """Collects events per base room and emits them as batches from a background task."""
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self.pending = {}
+        self.formats = {}
+        self._lock = threading.Lock()
+        self._running = False
+
+    def add_client(self, sid, wire_format):
+        with self._lock:
+            self.formats[sid] = wire_format
+
+    def remove_client(self, sid):
+        with self._lock:
+            self.formats.pop(sid, None)
+
+    def active_formats(self):
+        with self._lock:
+            return {f for f in self.formats.values() if f != 'json'}
+
+    def add(self, base_room, event):
+        """Queue an event for the compact rooms; a no-op while no client uses them."""
+        if not self.formats:
+            return
+        with self._lock:
+            self.pending.setdefault(base_room, []).append(event)
+            start = not self._running
+            self._running = True
+        if start:
+            self.socketio.start_background_task(self._flush_loop)
+
+    def flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        formats = self.active_formats()
+        for base_room, events in pending.items():
+            for offset in range(0, len(events), WIRE_BATCH_MAX):
+                batch = encode_batch(events[offset:offset + WIRE_BATCH_MAX])
+                if 'compact' in formats:
+                    self.socketio.emit('hpfeedbatch', batch, to=room_for(base_room, 'compact'))
+                if 'msgpack' in formats:
+                    self.socketio.emit('hpfeedbatch', pack(batch), to=room_for(base_room, 'msgpack'))
+
+    def _flush_loop(self):
+        while True:
+            self.socketio.sleep(WIRE_BATCH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing event batches: {e}")
@@ -1,10 +1,14 @@
 """Geocode module for IP geolocation services."""
 import os
 import json
+import threading
+from functools import lru_cache
 from pathlib import Path
 from flask import Blueprint, request, jsonify
 import requests
 from seckc_mhn_api.config import SETTINGS
+from seckc_mhn_api.serializer import dumps_bytes, json_response
+from seckc_mhn_api.ratelimit import rate_limit
 import geoip2.database
 import geoip2.errors
 
@@ -14,26 +18,43 @@ GEOCODE_MODULE = Blueprint('geocode', __name__, url_prefix='/geocode')
 script_dir = Path(__file__).parent
 geodatabase_path = script_dir / ".." / ".." / "geodatabase" / "GeoLite2-City.mmdb"
 
-# Initialize GeoIP reader with error handling
-reader = None
-try:
-    if geodatabase_path.exists():
-        reader = geoip2.database.Reader(str(geodatabase_path))
-        print(f"GeoIP database loaded: {geodatabase_path}")
-    else:
-        print(f"GeoIP database not found: {geodatabase_path}")
-except Exception as e:
-    print(f"Failed to load GeoIP database: {e}")
+# GeoIP reader is opened on first lookup, not at import
+_reader = None
+_reader_loaded = False
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """Return the GeoIP reader, loading the database on first call."""
+    global _reader, _reader_loaded
+    if not _reader_loaded:
+        with _reader_lock:
+            if not _reader_loaded:
+                try:
+                    if geodatabase_path.exists():
+                        _reader = geoip2.database.Reader(str(geodatabase_path))
+                        print(f"GeoIP database loaded: {geodatabase_path}")
+                    else:
+                        print(f"GeoIP database not found: {geodatabase_path}")
+                except Exception as e:
+                    print(f"Failed to load GeoIP database: {e}")
+                _reader_loaded = True
+    return _reader
+
+@lru_cache(maxsize=4096)
+def _geocode_body(ip):
+    """Serialized GeoIP record for an IP. The database is read-only, so the bytes can be reused."""
+    return dumps_bytes(get_reader().city(ip).raw)
 
 @GEOCODE_MODULE.route("/<ip>", methods=['GET'])
+@rate_limit('geocode')
 def geocode(ip):
     """Get geolocation data for an IP address."""
+    reader = get_reader()
     if not reader:
         return jsonify({"error": "GeoIP database unavailable"}), 500
     
     try:
-        response = reader.city(ip)
-        return jsonify(response.raw)
+        return json_response(_geocode_body(ip))
     except geoip2.errors.AddressNotFoundError:
         return jsonify({"error": f"No geolocation data found for IP: {ip}"}), 404
     except Exception as e:
@@ -42,6 +63,7 @@ def geocode(ip):
 
 def geocodeinternal(ip):
     """Internal function for geocoding IPs."""
+    reader = get_reader()
     if not reader:
         return {"error": "GeoIP database unavailable"}
     
@@ -53,3 +75,30 @@ def geocodeinternal(ip):
     except Exception as e:
         print(f"Internal geocoding error for IP {ip}: {e}")
         return {"error": "Geocoding failed"}
+
+def flatten_location(lookup):
+    """Trim a GeoIP record for the sensor map, in place.
+
+    Drops ``traits`` and copies nested latitude/longitude to the top level
+    for frontend compatibility.
+    """
+    if lookup and "traits" in lookup:
+        del lookup["traits"]
+    if lookup and isinstance(lookup.get("location"), dict):
+        nested_location = lookup["location"]
+        if "latitude" in nested_location and "longitude" in nested_location:
+            lookup["latitude"] = nested_location["latitude"]
+            lookup["longitude"] = nested_location["longitude"]
+    return lookup
+
+def geocodeinternal_many(ips):
+    """Geocode many IPs in one pass, looking each distinct IP up once.
+
+    Returns a dict of IP to flattened location. MaxMind lookups are local and
+    CPU bound, so a single pass beats a thread pool under the GIL.
+    """
+    locations = {}
+    for ip in ips:
+        if ip not in locations:
+            locations[ip] = flatten_location(geocodeinternal(ip))
+    return locations
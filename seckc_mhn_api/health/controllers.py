@@ -0,0 +1,34 @@
+"""Health module for liveness and readiness checks."""
+import time
+from flask import Blueprint, jsonify
+from seckc_mhn_api import mongo
+from seckc_mhn_api.compression import no_store
+from seckc_mhn_api.geocode.controllers import get_reader
+from seckc_mhn_api.feeds import hpfeed_relay
+
+HEALTH_MODULE = Blueprint('health', __name__, url_prefix='/health')
+
+@HEALTH_MODULE.route("/live", methods=['GET'])
+def live():
+    """Report that the process is up and serving requests."""
+    return no_store(jsonify({"status": "ok", "server_time": time.time()}))
+
+@HEALTH_MODULE.route("/ready", methods=['GET'])
+def ready():
+    """Report readiness of MongoDB, the GeoIP database and the HPFeeds relay.
+
+    Checking readiness makes the lazy connections, so the first call warms
+    the worker up. The relay is informational only; it may be disabled.
+    """
+    checks = {
+        "mongodb": mongo.ping(),
+        "geoip": get_reader() is not None
+    }
+    is_ready = all(checks.values())
+
+    return no_store(jsonify({
+        "status": "ready" if is_ready else "unavailable",
+        "checks": checks,
+        "relay": hpfeed_relay.status(),
+        "server_time": time.time()
+    })), 200 if is_ready else 503
@@ -0,0 +1,170 @@
+"""MongoDB (Mnemosyne) connection, created lazily and once per process.
+
+MongoClient is not fork-safe, so a client inherited from a parent process
+(e.g. a uWSGI master) is discarded and rebuilt in the child on first use.
+Pool sizing, timeouts, compression and read preference come from the
+environment; see mongo_options().
+"""
+import os
+import threading
+from pymongo import MongoClient, monitoring
+from seckc_mhn_api.config import SETTINGS
+
+_CLIENT = None
+_CLIENT_PID = None
+_CLIENT_LOCK = threading.Lock()
+
+# Integer MongoClient options and the environment variables that set them
+POOL_OPTIONS = {
+    'maxPoolSize': 'MONGO_MAX_POOL_SIZE',
+    'minPoolSize': 'MONGO_MIN_POOL_SIZE',
+    'maxIdleTimeMS': 'MONGO_MAX_IDLE_TIME_MS',
+    'waitQueueTimeoutMS': 'MONGO_WAIT_QUEUE_TIMEOUT_MS',
+    'connectTimeoutMS': 'MONGO_CONNECT_TIMEOUT_MS',
+    'socketTimeoutMS': 'MONGO_SOCKET_TIMEOUT_MS',
+    'serverSelectionTimeoutMS': 'MONGO_SERVER_SELECTION_TIMEOUT_MS',
+}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks how long requests wait to check a connection out of the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.failures = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'failures': self.failures,
+                'avg_wait_ms': self.total_wait_ms / self.checkouts if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait_ms
+            }
+
+    def connection_checked_out(self, event):
+        wait_ms = getattr(event, 'duration', 0.0) * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failures += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+POOL_STATS = PoolStatsListener()
+
+
+def mongo_options():
+    """Build MongoClient keyword arguments from the environment and SETTINGS."""
+    mnemosyne = SETTINGS.get("mnemosyne", {}) or {}
+    options = {
+        'host': os.environ.get('MONGO_HOST', 'localhost'),
+        'port': int(os.environ.get('MONGO_PORT', 27017)),
+        'serverSelectionTimeoutMS': 5000,
+        'readPreference': os.environ.get('MONGO_READ_PREFERENCE', 'secondaryPreferred'),
+        'event_listeners': [POOL_STATS],
+        'connect': False
+    }
+    for option, env_var in POOL_OPTIONS.items():
+        if os.environ.get(env_var):
+            options[option] = int(os.environ[env_var])
+
+    # e.g. "zstd,snappy"; needs the zstandard / python-snappy packages
+    compressors = os.environ.get('MONGO_COMPRESSORS')
+    if compressors:
+        options['compressors'] = compressors
+
+    username = os.environ.get('MONGO_USER') or mnemosyne.get('username')
+    password = os.environ.get('MONGO_PASSWORD') or mnemosyne.get('password')
+    if username and password:
+        options['username'] = username
+        options['password'] = password
+        if os.environ.get('MONGO_AUTH_SOURCE'):
+            options['authSource'] = os.environ['MONGO_AUTH_SOURCE']
+    return options
+
+
+def get_client():
+    """Return this process's MongoClient, creating it on first call.
+
+    The client is built with ``connect=False`` so nothing touches the
+    network until the first query is issued.
+    """
+    global _CLIENT, _CLIENT_PID
+    pid = os.getpid()
+    if _CLIENT is None or _CLIENT_PID != pid:
+        with _CLIENT_LOCK:
+            if _CLIENT is None or _CLIENT_PID != pid:
+                _CLIENT = MongoClient(**mongo_options())
+                _CLIENT_PID = pid
+    return _CLIENT
+
+
+def _reset_after_fork():
+    """Drop the parent's client in a forked child; it is rebuilt on first use."""
+    global _CLIENT, _CLIENT_PID, _CLIENT_LOCK
+    _CLIENT = None
+    _CLIENT_PID = None
+    _CLIENT_LOCK = threading.Lock()
+    # Fresh lock as well as fresh counters; another thread may have held the old one
+    POOL_STATS.__init__()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_db():
+    """Return the Mnemosyne database handle, or None if the client can't be built."""
+    try:
+        return get_client()[os.environ.get('MONGO_DB', 'mnemosyne')]
+    except Exception as e:
+        print(f"MongoDB connection failed: {e}")
+        return None
+
+
+def ping():
+    """Return True if MongoDB answers a ping."""
+    try:
+        get_client().admin.command('ping')
+        return True
+    except Exception as e:
+        print(f"MongoDB ping failed: {e}")
+        return False
@@ -0,0 +1,192 @@
+"""Per-client rate limiting and admission control for public endpoints.
+
+Token buckets are keyed by client IP and whether the request has a
+verified CHN session, with a budget per endpoint. Buckets live in memory per
+process, or in a SQLite file (``RATE_LIMIT_STORE``, e.g. on /dev/shm) to
+share them between workers on one host. Endpoints that call the CHN
+server also take a slot from a global concurrency cap and are shed with
+503 when it is full, rather than queueing behind a slow upstream.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify
+from seckc_mhn_api.config import env_flag
+
+RATE_LIMIT_ENABLED = env_flag('RATE_LIMIT_ENABLED', True)
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', '')
+# Only trust X-Forwarded-For / X-Real-IP when running behind nginx or relayd
+RATE_LIMIT_TRUST_PROXY = env_flag('RATE_LIMIT_TRUST_PROXY', False)
+# Number of trusted proxies appending to X-Forwarded-For; the client is the entry they saw
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 1))
+# Clients with a verified session (see rate_limit) get this many times the anonymous budget
+RATE_LIMIT_AUTH_MULTIPLIER = float(os.environ.get('RATE_LIMIT_AUTH_MULTIPLIER', 5))
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 8))
+
+# Anonymous budgets as (tokens per second, burst); override with e.g. RATE_LIMIT_GEOCODE=5/20
+DEFAULT_BUDGETS = {
+    'geocode': (5.0, 20),
+    'attacker': (0.5, 5),
+    'events': (2.0, 10),
+    'replay': (0.05, 3),
+}
+
+def _budget(name):
+    override = os.environ.get(f'RATE_LIMIT_{name.upper()}')
+    if override:
+        rate, burst = override.split('/', 1)
+        return float(rate), int(burst)
+    return DEFAULT_BUDGETS[name]
+
+BUDGETS = {name: _budget(name) for name in DEFAULT_BUDGETS}
+
+def _refill(tokens, updated, now, rate, burst):
+    """Apply one token-bucket step. Returns (allowed, tokens left, retry_after seconds)."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, max(1, math.ceil((1 - tokens) / rate))
+
+
+class MemoryBucketStore(object):
+    """Token buckets in a process-local LRU dict of (tokens, updated)."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            allowed, tokens, retry_after = _refill(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteBucketStore(object):
+    """Token buckets in a SQLite file shared by all worker processes on the host."""
+
+    PRUNE_EVERY = 1000
+    PRUNE_AGE_SECONDS = 3600
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        # One connection per thread, and never one inherited across a fork
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def take(self, key, rate, burst):
+        # Wall clock, since monotonic clocks aren't comparable across processes
+        now = time.time()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            allowed, tokens, retry_after = _refill(tokens, updated, now, rate, burst)
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                         (key, tokens, now))
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - self.PRUNE_AGE_SECONDS,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, retry_after
+
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the bucket store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SQLiteBucketStore(RATE_LIMIT_STORE) if RATE_LIMIT_STORE else MemoryBucketStore()
+    return _store
+
+def client_ip():
+    """Best guess at the client address.
+
+    Entries left of the ones our own proxies appended to X-Forwarded-For
+    are whatever the client sent, so they are never used.
+    """
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+        if forwarded:
+            return forwarded[-min(RATE_LIMIT_PROXY_HOPS, len(forwarded))]
+        if request.headers.get('X-Real-IP', '').strip():
+            return request.headers['X-Real-IP'].strip()
+    return request.remote_addr or 'unknown'
+
+def rate_limit(name):
+    """Decorator applying the named per-client token-bucket budget; 429 with Retry-After when exhausted.
+
+    Place it inside ``user_status`` for the session multiplier to apply;
+    an unverified cookie gets the anonymous budget.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+
+            rate, burst = BUDGETS[name]
+            has_session = getattr(request, 'user_active', False) is True
+            if has_session:
+                rate, burst = rate * RATE_LIMIT_AUTH_MULTIPLIER, int(burst * RATE_LIMIT_AUTH_MULTIPLIER)
+            key = f"{name}:{client_ip()}:{'session' if has_session else 'anon'}"
+
+            try:
+                allowed, retry_after = get_store().take(key, rate, burst)
+            except Exception as e:
+                # Fail open: a broken limiter store shouldn't take the API down
+                print(f"Rate limiter error: {e}")
+                return f(*args, **kwargs)
+
+            if not allowed:
+                response = jsonify({"error": "Rate limit exceeded"})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+_upstream_slots = threading.BoundedSemaphore(UPSTREAM_MAX_CONCURRENCY)
+
+def upstream_slot(f):
+    """Decorator capping concurrent upstream-bound requests; 503 with Retry-After when full."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _upstream_slots.acquire(blocking=False):
+            response = jsonify({"error": "Server busy, try again shortly"})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _upstream_slots.release()
+    return decorated_function
@@ -1,76 +1,122 @@
 """Sensors module for retrieving sensor location data."""
 import os
 import json
-from flask import Blueprint, request, jsonify
+import time
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import requests
 from seckc_mhn_api.config import SETTINGS
 import certifi
-from seckc_mhn_api.geocode.controllers import geocodeinternal
+from seckc_mhn_api.geocode.controllers import flatten_location, geocodeinternal, geocodeinternal_many
+from seckc_mhn_api.serializer import dumps_bytes
+from seckc_mhn_api.compression import no_store
+from seckc_mhn_api.ratelimit import upstream_slot
+from seckc_mhn_api.feeds.throughput import CHANNEL_THROUGHPUT, SENSOR_THROUGHPUT
 
 SENSORS_MODULE = Blueprint('sensors', __name__, url_prefix='/sensors')
 
 # Updated to use CHN server instead of old MHN server
 CHN_SENSOR_URL = os.environ.get('CHN_SENSOR_URL', 'http://localhost:8000/api/sensor/')
+# A sensor with no events for this long is reported as silent
+SENSOR_SILENT_SECONDS = int(os.environ.get('SENSOR_SILENT_SECONDS', 900))
+
+def fetch_sensors():
+    """Fetch the sensor list from the CHN server. Raises requests.RequestException on failure."""
+    # Use CHN API endpoint instead of old MHN
+    api_key = os.environ.get("CHN_APIKEY", SETTINGS.get("chn", {}).get("apikey", SETTINGS.get("mhn", {}).get("apikey", "")))
+
+    headers = {
+        'apikey': api_key
+    }
+
+    sensor_request = requests.get(
+        CHN_SENSOR_URL,
+        headers=headers,
+        verify=certifi.where(),
+        timeout=30
+    )
+    sensor_request.raise_for_status()
+
+    print(f"Sensor request status: {sensor_request.status_code}")
+    return sensor_request.json()
+
+def sensor_health(stats):
+    """Add a status to a throughput entry: 'active', 'silent' or 'unseen'."""
+    if stats is None:
+        return {'status': 'unseen'}
+    if stats['seconds_since_seen'] is None:
+        # Only errors so far
+        stats['status'] = 'unseen'
+    else:
+        stats['status'] = 'silent' if stats['seconds_since_seen'] > SENSOR_SILENT_SECONDS else 'active'
+    return stats
+
+def sensor_identifier(sensor):
+    """HPFeeds identifier of a CHN sensor record (CHN uses the sensor uuid)."""
+    return sensor.get("uuid") or sensor.get("identifier")
+
+def locate_sensor(sensor, location, include_health, now):
+    entry = {"sensor_data": sensor, "location": location}
+    if include_health:
+        entry["health"] = sensor_health(SENSOR_THROUGHPUT.get(sensor_identifier(sensor), now=now))
+    return entry
+
+@SENSORS_MODULE.route("/health", methods=['GET'])
+def sensors_health():
+    """Per-sensor and per-channel throughput as seen by the HPFeeds relay (no upstream or Mongo calls)."""
+    now = time.time()
+    return no_store(jsonify({
+        'sensors': {ident: sensor_health(stats) for ident, stats in SENSOR_THROUGHPUT.snapshot(now=now).items()},
+        'channels': CHANNEL_THROUGHPUT.snapshot(now=now),
+        'silent_after_seconds': SENSOR_SILENT_SECONDS,
+        'server_time': now
+    }))
 
 @SENSORS_MODULE.route("/locations", methods=['GET'])
+@upstream_slot
 def sensors():
-    """Get sensor locations with geocoding."""
+    """Get sensor locations with geocoding; ?health=true adds relay throughput per sensor."""
+    include_health = request.args.get('health', 'false').lower() == 'true'
+    try:
+        response_json = fetch_sensors()
+        now = time.time()
+
+        # Sensors often share an IP; geocode each distinct one once
+        locations = geocodeinternal_many({sensor.get("ip", "") for sensor in response_json})
+        sensor_json = [
+            locate_sensor(sensor, locations.get(sensor.get("ip", "")), include_health, now)
+            for sensor in response_json
+        ]
+        # Health figures age with every request
+        return no_store(jsonify(sensor_json)) if include_health else jsonify(sensor_json)
+
+    except requests.RequestException as e:
+        print(f"Sensor request failed: {e}")
+        return jsonify({"error": "Failed to connect to CHN server"}), 500
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+@SENSORS_MODULE.route("/locations/stream", methods=['GET'])
+@upstream_slot
+def sensors_stream():
+    """Stream sensor locations as NDJSON, one sensor per line, so the map can draw as they arrive."""
+    include_health = request.args.get('health', 'false').lower() == 'true'
     try:
-        # Use CHN API endpoint instead of old MHN
-        api_key = os.environ.get("CHN_APIKEY", SETTINGS.get("chn", {}).get("apikey", SETTINGS.get("mhn", {}).get("apikey", "")))
-        
-        headers = {
-            'apikey': api_key
-        }
-        
-        sensor_request = requests.get(
-            CHN_SENSOR_URL, 
-            headers=headers,
-            verify=certifi.where(),
-            timeout=30
-        )
-        sensor_request.raise_for_status()
-        
-        print(f"Sensor request status: {sensor_request.status_code}")
-        
-        if sensor_request.status_code == 200:
-            response_json = sensor_request.json()
-            sensor_json = []
-            
-            for sensor in response_json:
-                try:
-                    sensor_lookup = geocodeinternal(sensor.get("ip", ""))
-                    if sensor_lookup and "traits" in sensor_lookup:
-                        del sensor_lookup["traits"]
-                    
-                    # Flatten location structure for frontend compatibility
-                    location_data = sensor_lookup
-                    if sensor_lookup and "location" in sensor_lookup and isinstance(sensor_lookup["location"], dict):
-                        # Extract latitude/longitude from nested structure
-                        nested_location = sensor_lookup["location"]
-                        if "latitude" in nested_location and "longitude" in nested_location:
-                            location_data = dict(sensor_lookup)  # Copy the response
-                            location_data["latitude"] = nested_location["latitude"]
-                            location_data["longitude"] = nested_location["longitude"]
-                    
-                    sensor_json.append({
-                        "sensor_data": sensor,
-                        "location": location_data
-                    })
-                except Exception as e:
-                    print(f"Error geocoding sensor {sensor.get('ip', 'unknown')}: {e}")
-                    sensor_json.append({
-                        "sensor_data": sensor,
-                        "location": None
-                    })
-                    
-            return jsonify(sensor_json)
-        
-        return jsonify({"error": "Failed to retrieve sensors"}), sensor_request.status_code
-        
+        response_json = fetch_sensors()
     except requests.RequestException as e:
         print(f"Sensor request failed: {e}")
         return jsonify({"error": "Failed to connect to CHN server"}), 500
     except Exception as e:
         print(f"Unexpected error: {e}")
         return jsonify({"error": "Internal server error"}), 500
+
+    def generate():
+        locations = {}
+        now = time.time()
+        for sensor in response_json:
+            ip = sensor.get("ip", "")
+            if ip not in locations:
+                locations[ip] = flatten_location(geocodeinternal(ip))
+            yield dumps_bytes(locate_sensor(sensor, locations[ip], include_health, now)) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,83 @@
+"""JSON serialization for API responses, Socket.IO emits and HPFeeds payloads.
+
+Uses orjson when it is installed and falls back to the standard library.
+"""
+import json
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    BACKEND = 'orjson'
+except ImportError:
+    orjson = None
+    BACKEND = 'json'
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps_bytes(obj, default=None):
+    """Serialize obj to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+        except TypeError:
+            # e.g. integers wider than 64 bits; let the stdlib have a go
+            pass
+    return json.dumps(obj, default=default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj, default=None):
+    """Serialize obj to a compact JSON string."""
+    return dumps_bytes(obj, default=default).decode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(body, status=200):
+    """Build a JSON response from already serialized bytes."""
+    return Response(body, status=status, mimetype='application/json')
+
+
+class SocketIOJSON(object):
+    """json module replacement for python-socketio (``SocketIO(json=...)``)."""
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return dumps(obj)
+
+    @staticmethod
+    def loads(data, *args, **kwargs):
+        return loads(data)
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider routing jsonify and plain dumps/loads through this module.
+
+    Pretty-printed responses (debug mode, or ``compact = False``) and calls
+    with extra arguments go through Flask's default provider unchanged.
+    """
+
+    sort_keys = False
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj, default=self.default) + b"\n", mimetype=self.mimetype)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, default=self.default)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
@@ -0,0 +1,83 @@
+"""In-memory LRU cache of serialized stats responses."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# Rough per-entry cost beyond the body: the entry dict, its etag string and
+# float, the OrderedDict node and the key tuple
+ENTRY_OVERHEAD = 512
+
+
+class ResultCache(object):
+    """Thread-safe LRU cache of response bodies with per-entry TTLs, a byte cap and an entry cap.
+
+    Entries are dicts with ``body`` (bytes), ``etag``, ``expires`` and
+    ``size``, the bytes charged against the cap (body, key and overhead).
+    """
+
+    def __init__(self, max_bytes, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the live entry for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires'] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, ttl):
+        """Store body under key for ttl seconds and return the new entry."""
+        entry = {
+            'body': body,
+            'etag': hashlib.blake2b(body, digest_size=16).hexdigest(),
+            'expires': time.monotonic() + ttl,
+            'size': len(body) + _key_size(key) + ENTRY_OVERHEAD
+        }
+        if entry['size'] > self.max_bytes:
+            return entry
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size += entry['size']
+            while self.size > self.max_bytes or (self.max_entries and len(self._entries) > self.max_entries):
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)['size']
+
+
+def _key_size(key):
+    parts = key if isinstance(key, tuple) else (key,)
+    return sum(len(part) for part in parts if isinstance(part, (str, bytes)))
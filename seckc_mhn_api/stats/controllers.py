@@ -2,91 +2,114 @@
 import os
 import json
 import datetime
-from pymongo import MongoClient
-from flask import Blueprint, request, abort, jsonify
+import threading
+import time
+from flask import Blueprint, current_app, request, abort, jsonify
 import requests
 from seckc_mhn_api.config import SETTINGS
 from seckc_mhn_api.auth.controllers import user_status
+from seckc_mhn_api.mongo import POOL_STATS, get_db
+from seckc_mhn_api.ratelimit import rate_limit, upstream_slot
+from seckc_mhn_api.serializer import dumps_bytes, json_response
+from seckc_mhn_api.stats.cache import ResultCache
+from seckc_mhn_api.stats.indexes import DAILY_STATS, query_shape
 import certifi
 
 STATS_MODULE = Blueprint('stats', __name__, url_prefix='/stats')
 
-# Load environment variables manually from .env file since uWSGI env-file isn't working
-def load_env_file(env_file_path):
-    """Load environment variables from file."""
-    env_vars = {}
-    try:
-        with open(env_file_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#') and '=' in line:
-                    key, value = line.split('=', 1)
-                    env_vars[key] = value
-                    os.environ[key] = value
-        return env_vars
-    except Exception as e:
-        print(f"Failed to load environment file {env_file_path}: {e}")
-        return {}
-
-# Load environment variables
-env_file_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'seckc_mhn_api.env')
-load_env_file(env_file_path)
-
-# MongoDB connection with error handling
-try:
-    mongo_host = os.environ.get('MONGO_HOST', 'localhost')
-    mongo_port = int(os.environ.get('MONGO_PORT', 27017))
-    database = os.environ.get('MONGO_DB', 'mnemosyne')
-    
-    dbconn = MongoClient(host=mongo_host, port=mongo_port, serverSelectionTimeoutMS=5000)
-    db = dbconn[database]
-    
-    # Test connection
-    dbconn.admin.command('ismaster')
-    print(f"Connected to MongoDB at {mongo_host}:{mongo_port}")
-    
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    db = None
-
 # Updated URLs for CHN stack
 CHN_ATTACKERS_URL = os.environ.get('CHN_ATTACKERS_URL', 'http://localhost:8000/api/top_attackers/')
 CHN_ATTACKER_STATS_URL = os.environ.get('CHN_ATTACKER_STATS_URL', 'http://localhost:8000/api/attacker_stats/')
 
+# Per query shape timings for daily_stats, reported by /stats/timings
+SLOW_QUERY_MS = float(os.environ.get('MONGO_SLOW_QUERY_MS', 200))
+QUERY_TIMINGS = {}
+_timings_lock = threading.Lock()
+
+def record_query_timing(shape, elapsed_ms):
+    """Accumulate count/total/max timings for a query shape and log slow queries."""
+    with _timings_lock:
+        timing = QUERY_TIMINGS.setdefault(shape, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        timing['count'] += 1
+        timing['total_ms'] += elapsed_ms
+        timing['max_ms'] = max(timing['max_ms'], elapsed_ms)
+    if elapsed_ms > SLOW_QUERY_MS:
+        print(f"Slow daily_stats query ({shape}): {elapsed_ms:.1f} ms")
+
+# Serialized /stats/attacks responses keyed by (date, channel)
+STATS_CACHE_HISTORIC_TTL = int(os.environ.get('STATS_CACHE_HISTORIC_TTL', 86400))
+STATS_CACHE_CURRENT_TTL = int(os.environ.get('STATS_CACHE_CURRENT_TTL', 60))
+# Empty results are usually a mistyped channel or a day not aggregated yet
+STATS_CACHE_EMPTY_TTL = int(os.environ.get('STATS_CACHE_EMPTY_TTL', 60))
+STATS_CACHE = ResultCache(int(os.environ.get('STATS_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+                          int(os.environ.get('STATS_CACHE_MAX_ENTRIES', 4096)))
+
+@STATS_MODULE.route("/timings", methods=['GET'])
+def getquerytimings():
+    """Report daily_stats query timings by query shape, result cache counters and pool checkout waits."""
+    with _timings_lock:
+        timings = {
+            shape: dict(timing, avg_ms=timing['total_ms'] / timing['count'])
+            for shape, timing in QUERY_TIMINGS.items()
+        }
+    return jsonify({'queries': timings, 'cache': STATS_CACHE.stats(), 'pool': POOL_STATS.stats()})
+
+def stats_cache_ttl(date_param):
+    """Past days are effectively immutable; today's (or an undated) query still changes."""
+    if date_param:
+        day = date_param.replace('-', '')
+        if len(day) == 8 and day.isdigit() and day < datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d'):
+            return STATS_CACHE_HISTORIC_TTL
+    return STATS_CACHE_CURRENT_TTL
+
 @STATS_MODULE.route("/attacks", methods=['GET'])
 def getstats():
-    """Get attack statistics from MongoDB."""
-    if db is None:
-        return jsonify({"error": "Database connection unavailable"}), 500
-    
-    try:
-        date_param = request.args.get('date', default=None, type=str)
-        channel_param = request.args.get('channel', default=None, type=str)
-        
-        # Build MongoDB query
-        query = {}
-        if date_param:
-            query['date'] = date_param
-        if channel_param:
-            query['channel'] = channel_param
-            
-        if not query:
-            abort(400, 'Date or channel parameter required')
-        
-        results = list(db['daily_stats'].find(query))
-        
-        # Remove MongoDB ObjectId from results
-        for result in results:
-            if '_id' in result:
-                del result['_id']
-        
-        return jsonify(results)
-        
-    except Exception as e:
-        print(f"Error retrieving attack stats: {e}")
-        return jsonify({"error": "Failed to retrieve attack statistics"}), 500
+    """Get attack statistics from MongoDB, through the result cache."""
+    date_param = request.args.get('date', default=None, type=str)
+    channel_param = request.args.get('channel', default=None, type=str)
+
+    # Build MongoDB query
+    query = {}
+    if date_param:
+        query['date'] = date_param
+    if channel_param:
+        query['channel'] = channel_param
+
+    if not query:
+        abort(400, 'Date or channel parameter required')
+
+    entry = STATS_CACHE.get((date_param, channel_param))
+    cache_status = 'HIT'
+
+    if entry is None:
+        cache_status = 'MISS'
+        db = get_db()
+        if db is None:
+            return jsonify({"error": "Database connection unavailable"}), 500
+
+        try:
+            start = time.perf_counter()
+            # Leave out the MongoDB ObjectId
+            results = list(db[DAILY_STATS].find(query, {'_id': 0}))
+            record_query_timing(query_shape(query), (time.perf_counter() - start) * 1000)
+
+            body = dumps_bytes(results, default=current_app.json.default)
+            ttl = stats_cache_ttl(date_param)
+            if not results:
+                ttl = min(ttl, STATS_CACHE_EMPTY_TTL)
+            entry = STATS_CACHE.put((date_param, channel_param), body, ttl)
+
+        except Exception as e:
+            print(f"Error retrieving attack stats: {e}")
+            return jsonify({"error": "Failed to retrieve attack statistics"}), 500
+
+    response = json_response(entry['body'])
+    response.set_etag(entry['etag'])
+    response.headers['X-Cache'] = cache_status
+    return response.make_conditional(request)
 
 @STATS_MODULE.route("/attackers", methods=['GET'])
+@upstream_slot
 def getattackers():
     """Get top attackers from CHN server."""
     try:
@@ -120,6 +143,8 @@ def getattackers():
         return jsonify({"error": "Internal server error"}), 500
 
 @STATS_MODULE.route("/attacker/<ip>", methods=['GET'])
+@rate_limit('attacker')
+@upstream_slot
 def getattackerstats(ip):
     """Get statistics for a specific attacker IP."""
     try:
@@ -0,0 +1,73 @@
+"""Index management and query-plan checks for the collections the API queries."""
+from pymongo import ASCENDING
+
+DAILY_STATS = 'daily_stats'
+SESSION = 'session'
+
+INDEXES = [
+    # (date, channel) serves date and date+channel lookups; (channel, date) serves channel-only lookups
+    {'collection': DAILY_STATS, 'keys': [('date', ASCENDING), ('channel', ASCENDING)], 'name': 'date_1_channel_1'},
+    {'collection': DAILY_STATS, 'keys': [('channel', ASCENDING), ('date', ASCENDING)], 'name': 'channel_1_date_1'},
+    # Time-range scans for /feeds/replay
+    {'collection': SESSION, 'keys': [('timestamp', ASCENDING)], 'name': 'timestamp_1'},
+]
+
+# Query shapes issued by getstats, with sample values for explain()
+QUERY_SHAPES = {
+    'date': {'date': '1970-01-01'},
+    'channel': {'channel': 'cowrie.sessions'},
+    'channel+date': {'date': '1970-01-01', 'channel': 'cowrie.sessions'},
+}
+
+def query_shape(query):
+    """Name the shape of a daily_stats query, e.g. 'channel+date'."""
+    return '+'.join(sorted(query))
+
+def _existing_key_patterns(db, collection):
+    return [list(info['key']) for info in db[collection].index_information().values()]
+
+def ensure_indexes(db):
+    """Create any missing indexes. Returns 'collection.name' for every expected index.
+
+    An index whose key pattern already exists under another name (e.g. one
+    Mnemosyne created) is left alone.
+    """
+    names = []
+    for index in INDEXES:
+        if index['keys'] not in _existing_key_patterns(db, index['collection']):
+            db[index['collection']].create_index(index['keys'], name=index['name'])
+        names.append(f"{index['collection']}.{index['name']}")
+    return names
+
+def missing_indexes(db):
+    """Return 'collection.name' for expected indexes whose key pattern is not present."""
+    return [f"{index['collection']}.{index['name']}" for index in INDEXES
+            if index['keys'] not in _existing_key_patterns(db, index['collection'])]
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def explain_queries(db):
+    """Run explain() for every query shape and report the winning plan stages.
+
+    Each result has ``shape``, ``stages``, ``collscan`` and ``execution_ms``.
+    """
+    results = []
+    for shape, query in QUERY_SHAPES.items():
+        explanation = db[DAILY_STATS].find(query).explain()
+        stages = list(_plan_stages(explanation.get('queryPlanner', {}).get('winningPlan', {})))
+        results.append({
+            'shape': shape,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+            'execution_ms': explanation.get('executionStats', {}).get('executionTimeMillis')
+        })
+    return results
@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+
+pytest.importorskip('flask_socketio')
+eventlet = pytest.importorskip('eventlet')
+
+from seckc_mhn_api import api_base
+from seckc_mhn_api.config import check_monkey_patched, get_async_mode
+from seckc_mhn_api.feeds import hpfeed_relay
+
+
+@pytest.fixture(autouse=True)
+def no_env_file(monkeypatch):
+    # Keep a local seckc_mhn_api.env from overriding the environment under test
+    monkeypatch.setattr(api_base, 'load_env_file', lambda path: {})
+    monkeypatch.delenv('ASYNC_MODE', raising=False)
+
+
+def test_async_mode_defaults_to_threading():
+    assert get_async_mode() == 'threading'
+
+
+def test_async_mode_is_case_insensitive(monkeypatch):
+    monkeypatch.setenv('ASYNC_MODE', 'Eventlet')
+    assert get_async_mode() == 'eventlet'
+
+
+def test_unsupported_async_mode(monkeypatch):
+    monkeypatch.setenv('ASYNC_MODE', 'gevent')
+    with pytest.raises(ValueError):
+        get_async_mode()
+
+
+def test_create_app_threading():
+    app = api_base.create_app('testing', start_relay=False)
+    assert app.config['ASYNC_MODE'] == 'threading'
+    assert api_base.SOCKET_IO_APP.server.async_mode == 'threading'
+
+
+def test_create_app_eventlet_requires_monkey_patch(monkeypatch):
+    monkeypatch.setenv('ASYNC_MODE', 'eventlet')
+    monkeypatch.setattr(eventlet.patcher, 'is_monkey_patched', lambda module: False)
+    with pytest.raises(RuntimeError):
+        check_monkey_patched('eventlet')
+    with pytest.raises(RuntimeError):
+        api_base.create_app('testing', start_relay=False)
+
+
+def test_create_app_eventlet(monkeypatch):
+    monkeypatch.setenv('ASYNC_MODE', 'eventlet')
+    monkeypatch.setattr(eventlet.patcher, 'is_monkey_patched', lambda module: True)
+    app = api_base.create_app('testing', start_relay=False)
+    assert app.config['ASYNC_MODE'] == 'eventlet'
+    assert api_base.SOCKET_IO_APP.server.async_mode == 'eventlet'
+
+
+@pytest.fixture
+def relay(monkeypatch):
+    """Point the relay at a main() that runs until released."""
+    release = threading.Event()
+    monkeypatch.setattr(hpfeed_relay, '_relay_thread', None)
+    monkeypatch.setattr(hpfeed_relay, 'load_config',
+                        lambda: {'host': 'localhost', 'port': 10000, 'channels': [], 'ident': 'x', 'secret': 'y'})
+    yield monkeypatch, release
+    release.set()
+
+
+def test_relay_start_threading(relay):
+    monkeypatch, release = relay
+    monkeypatch.setattr(hpfeed_relay, 'main', lambda: release.wait(5))
+    api_base.create_app('testing', start_relay=False)
+
+    task = hpfeed_relay.start()
+    assert isinstance(task, threading.Thread)
+    assert hpfeed_relay._is_alive(task)
+    assert hpfeed_relay.start() is task
+
+    release.set()
+    task.join(5)
+    assert not hpfeed_relay._is_alive(task)
+    assert hpfeed_relay.start() is not task
+
+
+def test_relay_start_eventlet(relay):
+    monkeypatch, release = relay
+    monkeypatch.setenv('ASYNC_MODE', 'eventlet')
+    monkeypatch.setattr(eventlet.patcher, 'is_monkey_patched', lambda module: True)
+    monkeypatch.setattr(hpfeed_relay, 'main', lambda: None)
+    api_base.create_app('testing', start_relay=False)
+
+    task = hpfeed_relay.start()
+    assert isinstance(getattr(task, 'g', task), eventlet.greenthread.GreenThread)
+    assert hpfeed_relay._is_alive(task)
+    assert hpfeed_relay.start() is task
+
+    task.join()
+    eventlet.sleep(0)  # let the finished green thread exit
+    assert not hpfeed_relay._is_alive(task)
+    assert hpfeed_relay.start() is not task
+
+
+def test_is_alive_green_thread():
+    green = eventlet.spawn(lambda: None)
+    assert hpfeed_relay._is_alive(green)
+    green.wait()
+    assert not hpfeed_relay._is_alive(green)
+
+
+def test_relay_status_states(relay):
+    monkeypatch, release = relay
+    monkeypatch.setitem(hpfeed_relay.RELAY_STATE, 'started', False)
+    monkeypatch.setitem(hpfeed_relay.RELAY_STATE, 'running', False)
+    monkeypatch.setitem(hpfeed_relay.RELAY_STATE, 'error', None)
+    assert hpfeed_relay.status()['state'] == 'disabled'
+
+    monkeypatch.setattr(hpfeed_relay, 'main', lambda: release.wait(5))
+    api_base.create_app('testing', start_relay=False)
+    task = hpfeed_relay.start()
+    assert hpfeed_relay.status()['state'] == 'starting'
+    hpfeed_relay.RELAY_STATE['running'] = True
+    assert hpfeed_relay.status()['state'] == 'active'
+
+    hpfeed_relay.RELAY_STATE['running'] = False
+    release.set()
+    task.join(5)
+    assert hpfeed_relay.status()['state'] == 'stopped'
+    hpfeed_relay.RELAY_STATE['error'] = 'connection refused'
+    assert hpfeed_relay.status()['state'] == 'error'
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip('flask_socketio')
+
+from seckc_mhn_api import api_base
+from seckc_mhn_api.feeds import controllers as feeds
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_base, 'load_env_file', lambda path: {})
+    monkeypatch.delenv('ASYNC_MODE', raising=False)
+    monkeypatch.setattr(feeds, 'recent_events_cache', type(feeds.recent_events_cache)(maxlen=100))
+    app = api_base.create_app('testing', start_relay=False)
+    return app.test_client()
+
+
+def test_recent_events_etag_ignores_server_time(client):
+    feeds.cache_event({'channel': 'cowrie.sessions', 'src_ip': '203.0.113.1', 'hostIP': '192.0.2.10'})
+    first = client.get('/feeds/events/recent')
+    second = client.get('/feeds/events/recent')
+    assert first.get_json()['server_time'] != second.get_json()['server_time']
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert first.headers['ETag'].startswith('W/')
+
+    revalidated = client.get('/feeds/events/recent', headers={'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+
+
+def test_recent_events_etag_changes_with_events(client):
+    feeds.cache_event({'channel': 'cowrie.sessions'})
+    etag = client.get('/feeds/events/recent').headers['ETag']
+    feeds.cache_event({'channel': 'dionaea.connections'})
+    response = client.get('/feeds/events/recent', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['count'] == 2
+
+
+def test_recent_events_304_for_compressed_variant(client):
+    for i in range(50):
+        feeds.cache_event({'channel': 'cowrie.sessions', 'src_ip': f'203.0.113.{i}', 'data': 'x' * 40})
+    first = client.get('/feeds/events/recent', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    revalidated = client.get('/feeds/events/recent', headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.parametrize('path', ['/health/live', '/sensors/health', '/feeds/status'])
+def test_live_status_is_not_etagged(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+    assert 'no-store' in response.headers['Cache-Control']
+
+
+def test_compression_min_size_from_environment(monkeypatch):
+    # Set the way seckc_mhn_api.env would be, after every module is imported
+    monkeypatch.setattr(api_base, 'load_env_file', lambda path: monkeypatch.setenv('COMPRESSION_MIN_SIZE', '10'))
+    monkeypatch.delenv('ASYNC_MODE', raising=False)
+    client = api_base.create_app('testing', start_relay=False).test_client()
+    response = client.get('/feeds/events/recent', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_feed_status_reports_relay(client):
+    body = client.get('/feeds/status').get_json()
+    assert body['status'] == body['relay']['state']
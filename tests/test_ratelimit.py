@@ -0,0 +1,54 @@
+import pytest
+
+flask = pytest.importorskip('flask')
+
+from seckc_mhn_api import ratelimit
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(ratelimit, '_store', ratelimit.MemoryBucketStore())
+    monkeypatch.setitem(ratelimit.BUDGETS, 'events', (0.001, 2))
+    return flask.Flask(__name__)
+
+
+@pytest.mark.parametrize('hops, expected', [(1, '198.51.100.7'), (2, '203.0.113.5'), (5, '10.0.0.1')])
+def test_client_ip_uses_rightmost_trusted_hop(app, monkeypatch, hops, expected):
+    monkeypatch.setattr(ratelimit, 'RATE_LIMIT_TRUST_PROXY', True)
+    monkeypatch.setattr(ratelimit, 'RATE_LIMIT_PROXY_HOPS', hops)
+    headers = {'X-Forwarded-For': '10.0.0.1, 203.0.113.5, 198.51.100.7', 'X-Real-IP': '192.0.2.1'}
+    with app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        assert ratelimit.client_ip() == expected
+
+
+def test_client_ip_ignores_headers_unless_trusted(app, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATE_LIMIT_TRUST_PROXY', False)
+    headers = {'X-Forwarded-For': '10.0.0.1', 'X-Real-IP': '10.0.0.2'}
+    with app.test_request_context(headers=headers, environ_base={'REMOTE_ADDR': '127.0.0.1'}):
+        assert ratelimit.client_ip() == '127.0.0.1'
+
+
+def allowed_requests(app, user_active=None, cookie=True):
+    view = ratelimit.rate_limit('events')(lambda: 'ok')
+    allowed = 0
+    headers = {'Cookie': 'session=x'} if cookie else {}
+    for _ in range(20):
+        with app.test_request_context(headers=headers):
+            if user_active is not None:
+                flask.request.user_active = user_active
+            allowed += view() == 'ok'
+    return allowed
+
+
+def test_unverified_cookie_gets_anonymous_budget(app):
+    assert allowed_requests(app, user_active=None) == 2
+
+
+def test_inactive_session_gets_anonymous_budget(app):
+    assert allowed_requests(app, user_active=False) == 2
+
+
+def test_verified_session_gets_multiplier(app, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'RATE_LIMIT_AUTH_MULTIPLIER', 5)
+    assert allowed_requests(app, user_active=True) == 10
@@ -0,0 +1,108 @@
+import datetime
+
+import pytest
+
+pytest.importorskip('flask_socketio')
+bson = pytest.importorskip('bson')
+
+from seckc_mhn_api.feeds import replay
+
+
+def session_document():
+    """A session document as Mnemosyne stores it."""
+    return {
+        'hpfeed_id': bson.ObjectId('65a5c0d0e4b0a1b2c3d4e5f6'),
+        'timestamp': datetime.datetime(2024, 1, 15, 13, 0, 0),
+        'source_ip': '203.0.113.7',
+        'source_port': 51234,
+        'destination_ip': '192.0.2.10',
+        'destination_port': 22,
+        'honeypot': 'cowrie',
+        'protocol': 'ssh',
+        'identifier': 'sensor-01',
+        'session_ssh': {'version': 'SSH-2.0-Go'},
+        'auth_attempts': [{'login': 'root', 'password': 'hunter2'}],
+    }
+
+
+def test_to_event_anonymous_strips_honeypot_address():
+    event = replay.to_event(session_document(), authenticated=False)
+    assert 'destination_ip' not in event
+    assert event['source_ip'] == '203.0.113.7'
+    assert event['replay'] is True
+
+
+def test_to_event_authenticated_keeps_everything():
+    event = replay.to_event(session_document(), authenticated=True)
+    assert event['destination_ip'] == '192.0.2.10'
+    assert event['timestamp'] == datetime.datetime(2024, 1, 15, 13, 0, 0,
+                                                   tzinfo=datetime.timezone.utc).timestamp()
+
+
+def test_to_event_serializes():
+    from seckc_mhn_api.serializer import SocketIOJSON, dumps_bytes
+
+    document = dict(session_document(), payload=b'\x00\xff')
+    event = replay.to_event(document, authenticated=True)
+    assert event['hpfeed_id'] == '65a5c0d0e4b0a1b2c3d4e5f6'
+    assert event['payload'] == '00ff'
+    assert dumps_bytes(event)
+    assert SocketIOJSON.dumps(event)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from seckc_mhn_api import api_base
+
+    monkeypatch.setattr(api_base, 'load_env_file', lambda path: {})
+    monkeypatch.delenv('ASYNC_MODE', raising=False)
+    return api_base.create_app('testing', start_relay=False).test_client()
+
+
+def test_ndjson_replay_reports_failure(client, monkeypatch):
+    from seckc_mhn_api.feeds import controllers as feeds
+
+    def failing_replay(*args, **kwargs):
+        yield {'replay': True}
+        raise RuntimeError('cursor died')
+
+    monkeypatch.setattr(feeds, 'get_db', lambda: object())
+    monkeypatch.setattr(feeds, 'ping', lambda: True)
+    monkeypatch.setattr(replay, 'replay', failing_replay)
+    response = client.get('/feeds/replay?start=0&end=60&speed=0')
+    assert response.status_code == 200
+    assert response.get_data().splitlines() == [b'{"replay":true}', b'{"error":"Replay failed"}']
+
+
+def test_ndjson_replay_unreachable_database(client, monkeypatch):
+    from seckc_mhn_api.feeds import controllers as feeds
+
+    monkeypatch.setattr(feeds, 'get_db', lambda: object())
+    monkeypatch.setattr(feeds, 'ping', lambda: False)
+    response = client.get('/feeds/replay?start=0&end=60')
+    assert response.status_code == 503
+
+
+def test_parse_replay_args():
+    assert replay.parse_replay_args({'start': '0', 'end': '60'}) == (0.0, 60.0, 10.0, 'session')
+    assert replay.parse_replay_args({'start': 0, 'end': 60, 'speed': 0}) == (0.0, 60.0, 0.0, 'session')
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'start': '0'},
+    {'start': 'x', 'end': '60'},
+    {'start': '60', 'end': '0'},
+    {'start': '0', 'end': 'nan'},
+    {'start': 'nan', 'end': '60'},
+    {'start': '-inf', 'end': '60'},
+    {'start': '0', 'end': '60', 'speed': 'nan'},
+    {'start': '0', 'end': '60', 'speed': '-1'},
+    {'start': '0', 'end': str(replay.REPLAY_MAX_RANGE_SECONDS + 1)},
+    {'start': '0', 'end': '60', 'collection': 'users'},
+    {'start': 0, 'end': 60, 'collection': ['session']},
+    {'start': 0, 'end': 60, 'collection': None},
+])
+def test_parse_replay_args_rejects(args):
+    with pytest.raises(ValueError):
+        replay.parse_replay_args(args)
@@ -0,0 +1,46 @@
+import pytest
+
+flask = pytest.importorskip('flask')
+orjson = pytest.importorskip('orjson')
+
+from seckc_mhn_api import serializer
+
+
+def make_app(debug=False):
+    app = flask.Flask(__name__)
+    app.debug = debug
+    app.json = serializer.JSONProvider(app)
+    return app
+
+
+def test_response_uses_orjson(monkeypatch):
+    calls = []
+    real_dumps = orjson.dumps
+
+    def fake_dumps(obj, **kwargs):
+        calls.append(obj)
+        return real_dumps(obj, **kwargs)
+
+    monkeypatch.setattr(serializer.orjson, 'dumps', fake_dumps)
+    app = make_app()
+    with app.app_context():
+        response = app.json.response({'b': 1, 'a': [1, 2]})
+    assert calls == [{'b': 1, 'a': [1, 2]}]
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"b":1,"a":[1,2]}\n'
+
+
+def test_jsonify_uses_provider(monkeypatch):
+    calls = []
+    monkeypatch.setattr(serializer, 'dumps_bytes', lambda obj, default=None: calls.append(obj) or b'{}')
+    app = make_app()
+    with app.app_context():
+        flask.jsonify(ok=True)
+    assert calls == [{'ok': True}]
+
+
+def test_debug_response_is_indented():
+    app = make_app(debug=True)
+    with app.app_context():
+        response = app.json.response({'a': 1})
+    assert response.get_data() == b'{\n  "a": 1\n}\n'
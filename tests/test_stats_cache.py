@@ -0,0 +1,35 @@
+from seckc_mhn_api.stats.cache import ENTRY_OVERHEAD, ResultCache
+
+
+def test_size_counts_key_and_overhead():
+    cache = ResultCache(max_bytes=10 * ENTRY_OVERHEAD)
+    entry = cache.put(('2024-01-15', 'cowrie.sessions'), b'[]', ttl=60)
+    assert entry['size'] == 2 + len('2024-01-15') + len('cowrie.sessions') + ENTRY_OVERHEAD
+    assert cache.stats()['bytes'] == entry['size']
+
+
+def test_tiny_bodies_are_bounded_by_bytes():
+    cache = ResultCache(max_bytes=10 * ENTRY_OVERHEAD)
+    for day in range(100):
+        cache.put((str(day), None), b'[]', ttl=60)
+    assert cache.stats()['entries'] < 10
+    assert cache.get(('99', None)) is not None
+    assert cache.get(('0', None)) is None
+
+
+def test_max_entries():
+    cache = ResultCache(max_bytes=1 << 20, max_entries=3)
+    for day in range(5):
+        cache.put((str(day), None), b'[]', ttl=60)
+    assert cache.stats()['entries'] == 3
+    assert cache.get(('1', None)) is None
+    assert cache.get(('4', None)) is not None
+
+
+def test_replacing_a_key_keeps_size_in_step():
+    cache = ResultCache(max_bytes=1 << 20)
+    cache.put('key', b'x' * 100, ttl=60)
+    entry = cache.put('key', b'x' * 10, ttl=60)
+    assert cache.stats()['bytes'] == entry['size']
+    cache.clear()
+    assert cache.stats()['bytes'] == 0
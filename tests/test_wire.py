@@ -0,0 +1,95 @@
+import pytest
+
+from seckc_mhn_api.feeds import wire
+
+
+def cowrie_event(i):
+    return {'identifier': f'sensor-{i % 2}', 'channel': 'cowrie.sessions', 'timestamp': 1642251600.0 + i,
+            'src_ip': f'203.0.113.{i}', 'dst_port': 22, 'protocol': 'ssh',
+            'data': {'username': 'root', 'password': f'hunter{i}'}}
+
+
+def dionaea_event(i):
+    return {'identifier': 'sensor-9', 'channel': 'dionaea.connections', 'timestamp': 1642251700.0 + i,
+            'remote_host': f'198.51.100.{i}', 'local_port': 445, 'transport': 'tcp', 'connection_type': None}
+
+
+def test_round_trip_mixed_channels():
+    events = [cowrie_event(0), dionaea_event(1), cowrie_event(2), {}, dionaea_event(3)]
+    assert wire.decode_batch(wire.encode_batch(events)) == events
+
+
+def test_round_trip_uniform_batch_needs_no_mask():
+    events = [cowrie_event(i) for i in range(5)]
+    batch = wire.encode_batch(events)
+    assert batch['present'] == [None] * len(batch['keys'])
+    assert wire.decode_batch(batch) == events
+
+
+def test_explicit_null_is_kept():
+    events = [{'channel': None}, {}]
+    assert wire.decode_batch(wire.encode_batch(events)) == events
+
+
+def test_dictionary_encodes_repeated_strings():
+    batch = wire.encode_batch([cowrie_event(i) for i in range(4)])
+    channel = batch['keys'].index('channel')
+    assert channel in batch['dict']
+    assert batch['columns'][channel] == [batch['strings'].index('cowrie.sessions')] * 4
+
+
+def test_round_trip_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    events = [cowrie_event(0), dionaea_event(1)]
+    assert wire.decode_batch(msgpack.unpackb(wire.pack(wire.encode_batch(events)))) == events
+
+
+class FakeSocketIO(object):
+    def __init__(self):
+        self.emitted = []
+        self.tasks = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+    def start_background_task(self, target, *args):
+        self.tasks.append(target)
+
+
+def test_batcher_is_idle_without_compact_clients():
+    socketio = FakeSocketIO()
+    batcher = wire.Batcher(socketio)
+    batcher.add('anonUsers', cowrie_event(0))
+    batcher.flush()
+    assert socketio.tasks == []
+    assert socketio.emitted == []
+
+
+def test_batcher_emits_per_room(monkeypatch):
+    monkeypatch.setattr(wire, 'WIRE_BATCH_MAX', 2)
+    socketio = FakeSocketIO()
+    batcher = wire.Batcher(socketio)
+    batcher.add_client('sid-1', 'compact')
+
+    anon = [cowrie_event(0), dionaea_event(1), cowrie_event(2)]
+    for event in anon:
+        batcher.add('anonUsers', event)
+    batcher.add('activeUsers', dionaea_event(4))
+    assert len(socketio.tasks) == 1
+
+    batcher.flush()
+    by_room = {}
+    for name, batch, room in socketio.emitted:
+        assert name == 'hpfeedbatch'
+        by_room.setdefault(room, []).extend(wire.decode_batch(batch))
+    assert by_room == {'anonUsers:compact': anon, 'activeUsers:compact': [dionaea_event(4)]}
+    assert [batch['n'] for _, batch, room in socketio.emitted if room == 'anonUsers:compact'] == [2, 1]
+
+    socketio.emitted.clear()
+    batcher.flush()
+    assert socketio.emitted == []
+
+    batcher.remove_client('sid-1')
+    batcher.add('anonUsers', cowrie_event(5))
+    batcher.flush()
+    assert socketio.emitted == []